@@ -1,5 +1,10 @@
+import os
+
 from website import create_app
 
+if __name__ == '__main__':
+    os.environ.setdefault('SAJILO_CONFIG', 'development')  # the local dev server
+
 app= create_app()
 
 
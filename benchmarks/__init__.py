@@ -0,0 +1,4 @@
+"""Stand-alone performance scripts. Run them from the repository root, e.g.
+``python -m benchmarks.search --products 100000``. Each one builds its own
+throwaway SQLite database and never touches ``instance/database.sqlite3``.
+"""
@@ -0,0 +1,97 @@
+"""Multi-threaded cart write/read throughput with and without the SQLite tuning.
+
+    python -m benchmarks.db_writes --threads 8 --seconds 5
+
+"stock" runs with SQLITE_PRAGMAS disabled and the driver's default lock
+timeout (rollback journal, synchronous=FULL), "tuned" uses the Config
+defaults from website/config.py (WAL, synchronous=NORMAL, busy_timeout, ...).
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+
+from website import create_app, db
+from website.cart import cart_totals
+from website.config import Config
+from website.models import Cart, Category, Customer, Product
+
+
+PROFILES = {
+    'stock': {'SQLITE_PRAGMAS': {}, 'SQLALCHEMY_ENGINE_OPTIONS': {}},
+    'tuned': {'SQLITE_PRAGMAS': Config.SQLITE_PRAGMAS},
+}
+
+
+def seed(customers, products=20):
+    db.session.add(Category(id=1, name='Benchmark'))
+    db.session.add_all(Product(id=i, product_name=f'Product {i}', current_price=100 + i, in_stock=10 ** 6,
+                               category_id=1) for i in range(1, products + 1))
+    db.session.add_all(Customer(id=i, email=f'bench{i}@example.com', username=f'bench{i}')
+                       for i in range(1, customers + 1))
+    db.session.add_all(Cart(customer_link=c, product_link=p, quantity=1)
+                       for c in range(1, customers + 1) for p in range(1, products + 1))
+    db.session.commit()
+
+
+def worker(app, customer_id, writer, deadline, counts, lock):
+    done = errors = 0
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            try:
+                if writer:
+                    # What /pluscart does: bump one line, commit
+                    db.session.execute(update(Cart).where(Cart.customer_link == customer_id)
+                                       .values(quantity=Cart.quantity + 1))
+                    db.session.commit()
+                else:
+                    cart_totals(customer_id)
+                    db.session.rollback()
+                done += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    with lock:
+        kind = 'writes' if writer else 'reads'
+        counts[kind] += done
+        counts['errors'] += errors
+
+
+def run(profile, threads, seconds):
+    path = os.path.join(tempfile.mkdtemp(prefix='sajilo-bench-'), f'{profile}.sqlite3')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', **PROFILES[profile]})
+    with app.app_context():
+        db.create_all()
+        seed(threads)
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    # Half the threads write, half read, each on its own customer's cart
+    pool = [threading.Thread(target=worker, args=(app, i + 1, i % 2 == 0, deadline, counts, lock))
+            for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'{"profile":<8}{"writes/s":>10}{"reads/s":>10}{"lock errors":>13}')
+    for profile in PROFILES:
+        counts = run(profile, args.threads, args.seconds)
+        print(f'{profile:<8}{counts["writes"] / args.seconds:>10.0f}{counts["reads"] / args.seconds:>10.0f}'
+              f'{counts["errors"]:>13}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Login throughput for each password hashing policy.
+
+    python -m benchmarks.passwords --threads 16 --seconds 5
+    python -m benchmarks.passwords --policy scrypt:16384:8:1 --policy pbkdf2:sha256:600000
+
+Each policy gets a fresh database whose customers were signed up with it;
+--threads clients then POST /login as fast as they can. "verify ms" is one
+hash check on its own, "logins/s/core" divides the measured throughput by
+the cores the hashing pool could use, and "503s" counts logins turned away
+because PASSWORD_HASH_MAX_PENDING hashes were already queued; "errors" are
+any other responses (a failed login re-renders the form).
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from website import create_app, db
+from website.config import Config
+from website.models import Customer
+from website.passwords import PasswordPolicy
+
+
+POLICIES = ['scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256:1000000', 'pbkdf2:sha256:600000']
+PASSWORD = 'benchmark-password'
+
+
+def seed(customers):
+    db.session.add_all(Customer(id=i, email=f'bench{i}@example.com', username=f'bench{i}', password=PASSWORD)
+                       for i in range(1, customers + 1))
+    db.session.commit()
+
+
+def verify_ms(method, rounds=5):
+    policy = PasswordPolicy(method, workers=1)
+    stored = policy.hash(PASSWORD)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        policy.verify(stored, PASSWORD)
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def worker(app, index, customers, deadline, counts, lock):
+    client = app.test_client()
+    done = busy = errors = 0
+    i = index
+    while time.perf_counter() < deadline:
+        i = i % customers + 1
+        response = client.post('/login', data={'email': f'bench{i}@example.com', 'password': PASSWORD})
+        if response.status_code == 302:
+            done += 1
+        elif response.status_code == 503:
+            busy += 1
+        else:
+            errors += 1
+        client.get('/logout')
+    with lock:
+        counts['logins'] += done
+        counts['busy'] += busy
+        counts['errors'] += errors
+
+
+def run(method, args):
+    path = os.path.join(tempfile.mkdtemp(prefix='sajilo-bench-'), 'passwords.sqlite3')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'WTF_CSRF_ENABLED': False,
+                      'LOG_LEVEL': 'WARNING', 'RATE_LIMIT_ENABLED': False, 'PASSWORD_HASH_METHOD': method,
+                      'PASSWORD_HASH_WORKERS': args.workers, 'PASSWORD_HASH_MAX_PENDING': args.max_pending})
+    with app.app_context():
+        db.create_all()
+        seed(args.customers)
+
+    counts, lock = {'logins': 0, 'busy': 0, 'errors': 0}, threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=worker, args=(app, i, args.customers, deadline, counts, lock))
+               for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--policy', action='append', help='Werkzeug hash method (repeatable); default: a few presets')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=Config.PASSWORD_HASH_WORKERS, help='PASSWORD_HASH_WORKERS')
+    parser.add_argument('--max-pending', type=int, default=64, help='PASSWORD_HASH_MAX_PENDING')
+    args = parser.parse_args()
+    cores = min(args.workers, os.cpu_count() or 1)
+
+    print(f'{"policy":<24}{"verify ms":>11}{"logins/s":>10}{"logins/s/core":>15}{"503s":>7}{"errors":>8}')
+    for method in args.policy or POLICIES:
+        counts = run(method, args)
+        rate = counts['logins'] / args.seconds
+        print(f'{method:<24}{verify_ms(method):>11.1f}{rate:>10.1f}{rate / cores:>15.1f}'
+              f'{counts["busy"]:>7}{counts["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
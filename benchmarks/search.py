@@ -0,0 +1,80 @@
+"""Compare the FTS5 product search with the old ILIKE '%q%' scan.
+
+    python -m benchmarks.search --products 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from website import create_app, db
+from website.models import Category, Product
+from website.search import SEARCH_RESULT_LIMIT, create_search_index, search_products
+
+
+BRANDS = ['Apple', 'Samsung', 'Oraimo', 'Xiaomi', 'Sony', 'HP', 'Lenovo', 'Nivea', 'Tecno', 'Infinix']
+NOUNS = ['iPhone', 'Galaxy', 'Watch', 'Earbuds', 'Soundbar', 'Printer', 'Laptop', 'Lotion', 'Charger',
+         'Speaker', 'Monitor', 'Keyboard', 'Spaghetti', 'Peanut Butter', 'Saree', 'Makeup Kit']
+EXTRAS = ['Pro', 'Max', 'Mini', 'Plus', 'Ultra', 'Lite', 'Wireless', 'Smart', '16', '256GB', 'Black', 'Blue']
+QUERIES = ['iphone', 'pro max', 'wireless ear', 'sams gal', 'peanut', 'notfound']
+
+
+def product_name(rng):
+    return ' '.join([rng.choice(BRANDS), rng.choice(NOUNS)] + rng.sample(EXTRAS, rng.randint(0, 3)))
+
+
+def seed(count, rng, batch=10000):
+    db.session.add(Category(id=1, name='Benchmark'))
+    db.session.commit()
+    for start in range(0, count, batch):
+        rows = [{'product_name': product_name(rng), 'current_price': rng.randint(100, 200000),
+                 'previous_price': None, 'in_stock': 10, 'flash_sale': False, 'category_id': 1}
+                for _ in range(min(batch, count - start))]
+        db.session.execute(insert(Product), rows)
+    db.session.commit()
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='sajilo-bench-'), 'search.sqlite3')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        seed(args.products, random.Random(args.seed))
+        print(f'seeded {args.products} products + FTS index in {time.perf_counter() - start:.1f}s ({path})')
+
+        # "ilike" is the old view query; speedup is measured against it. "ilike/lim"
+        # caps it at the FTS row limit for reference: it can stop early on common
+        # words but returns unranked rows and still scans everything on misses.
+        print(f'{"query":<16}{"ilike ms":>10}{"rows":>8}{"ilike/lim ms":>14}{"fts ms":>10}{"rows":>8}{"speedup":>9}')
+        for query in QUERIES:
+            ilike = Product.query.filter(Product.product_name.ilike(f'%{query}%'))
+            ilike_ms, ilike_rows = timed(lambda: ilike.all(), args.repeat)
+            limited_ms, _ = timed(lambda: ilike.limit(SEARCH_RESULT_LIMIT).all(), args.repeat)
+            fts_ms, fts_rows = timed(lambda: search_products(query), args.repeat)
+            print(f'{query:<16}{ilike_ms:>10.2f}{ilike_rows:>8}{limited_ms:>14.2f}{fts_ms:>10.2f}{fts_rows:>8}'
+                  f'{ilike_ms / fts_ms:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
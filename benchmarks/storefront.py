@@ -0,0 +1,232 @@
+"""End-to-end latency of the main storefront routes under concurrent load.
+
+    python -m benchmarks.storefront --products 20000 --orders 50000 --threads 4 --requests 100
+
+Seeds a throwaway SQLite database with the requested volumes, then drives
+each route through Flask test clients from --threads threads at once and
+reports p50/p95/p99 latency, SQL queries per request and throughput.
+/verify-khalti runs against an in-process stub gateway (--gateway-ms of
+simulated latency), so no payment traffic leaves the machine. Pass --json
+to save the numbers alongside the current commit for comparison.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert, select
+
+from website import create_app, db
+from website.models import Cart, Category, Customer, Order, Product, Wishlist, ROLE_ADMIN, ROLE_CUSTOMER
+from website.reports import rebuild_rollups
+from website.search import create_search_index
+from benchmarks.search import QUERIES, product_name
+
+
+ADMIN_ID = 3  # seeded with the admin role for the view-orders route
+ROUTES = ('home', 'search', 'cart', 'pluscart', 'view-orders', 'verify-khalti')
+STATUSES = ['Paid', 'Pending', 'Accepted', 'Out for delivery', 'Delivered', 'Canceled']
+
+
+class StubGateway:
+    """Stands in for KhaltiClient: every payment verifies after a fixed delay."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def verify(self, token, amount):
+        time.sleep(self.latency)
+        return True
+
+
+def _insert(model, rows, batch=10000):
+    for start in range(0, len(rows), batch):
+        db.session.execute(insert(model), rows[start:start + batch])
+    db.session.commit()
+
+
+def seed(args, rng):
+    """Fill the database with the volumes from the command line."""
+    now = datetime.utcnow()
+    _insert(Category, [{'id': i, 'name': f'Category {i}'} for i in range(1, args.categories + 1)])
+    # password_hash is left empty: the benchmark logs in through the session
+    _insert(Customer, [{'id': i, 'email': f'bench{i}@example.com', 'username': f'bench{i}',
+                        'role': ROLE_ADMIN if i == ADMIN_ID else ROLE_CUSTOMER}
+                       for i in range(1, args.customers + 1)])
+    _insert(Product, [{'id': i, 'product_name': product_name(rng), 'current_price': rng.randint(100, 200000),
+                       'previous_price': None, 'in_stock': 10 ** 9, 'flash_sale': rng.random() < 0.2,
+                       'product_picture': None, 'category_id': rng.randint(1, args.categories),
+                       'date_added': now - timedelta(minutes=i)}
+                      for i in range(1, args.products + 1)])
+    cart, wishlist = [], []
+    for customer_id in range(1, args.customers + 1):
+        for product_id in rng.sample(range(1, args.products + 1), args.cart_items):
+            cart.append({'customer_link': customer_id, 'product_link': product_id, 'quantity': 1})
+        for product_id in rng.sample(range(1, args.products + 1), args.wishlist_items):
+            wishlist.append({'customer_id': customer_id, 'product_id': product_id, 'quantity': 1})
+    _insert(Cart, cart)
+    _insert(Wishlist, wishlist)
+    _insert(Order, [{'quantity': rng.randint(1, 3), 'price': rng.randint(100, 200000),
+                     'status': rng.choice(STATUSES), 'payment_id': f'seed-{i}',
+                     'customer_link': rng.randint(1, args.customers),
+                     'product_link': rng.randint(1, args.products),
+                     'date_created': now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))}
+                    for i in range(args.orders)])
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+    rebuild_rollups()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, max(0, math.ceil(pct / 100 * len(samples)) - 1))]
+
+
+class Harness:
+    def __init__(self, app, args):
+        self.app = app
+        self.args = args
+        self.local = threading.local()
+        event.listen(db.engine, 'before_cursor_execute', self._count_query)
+
+    def _count_query(self, *_):
+        self.local.queries = getattr(self.local, 'queries', 0) + 1
+
+    def client(self, customer_id):
+        client = self.app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(customer_id)
+            session['_fresh'] = True
+        return client
+
+    def cart_ids(self, customer_id):
+        with self.app.app_context():
+            return db.session.execute(select(Cart.id).where(Cart.customer_link == customer_id)).scalars().all()
+
+    def refill_cart(self, customer_id, rng):
+        with self.app.app_context():
+            db.session.add(Cart(customer_link=customer_id, product_link=rng.randint(1, self.args.products),
+                                quantity=1))
+            db.session.commit()
+
+    def request(self, route, client, customer_id, rng, state):
+        """Issue one request for `route`; returns the response."""
+        if route == 'home':
+            return client.get('/')
+        if route == 'search':
+            return client.post('/search', data={'search': rng.choice(QUERIES)})
+        if route == 'cart':
+            return client.get('/cart')
+        if route == 'pluscart':
+            return client.get(f'/pluscart?cart_id={rng.choice(state["cart_ids"])}')
+        if route == 'view-orders':
+            return client.get('/view-orders')
+        if route == 'verify-khalti':
+            return client.post('/verify-khalti', json={'token': f'bench-{rng.random()}', 'amount': 100})
+        raise ValueError(route)
+
+    def worker(self, route, index, results, lock):
+        rng = random.Random(index)
+        customer_id = ADMIN_ID if route == 'view-orders' else index % self.args.customers + 1
+        client = self.client(customer_id)
+        state = {'cart_ids': self.cart_ids(customer_id) if route == 'pluscart' else []}
+        latencies, queries, errors = [], [], 0
+        for _ in range(self.args.requests):
+            if route == 'verify-khalti':
+                self.refill_cart(customer_id, rng)  # untimed: each payment needs something to buy
+            self.local.queries = 0
+            start = time.perf_counter()
+            response = self.request(route, client, customer_id, rng, state)
+            latencies.append(time.perf_counter() - start)
+            queries.append(self.local.queries)
+            if response.status_code >= 400 or (route == 'verify-khalti' and not response.get_json().get('success')):
+                errors += 1
+        with lock:
+            results['latencies'].extend(latencies)
+            results['queries'].extend(queries)
+            results['errors'] += errors
+
+    def run(self, route):
+        results = {'latencies': [], 'queries': [], 'errors': 0}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=self.worker, args=(route, i, results, lock))
+                   for i in range(self.args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        latencies = sorted(results['latencies'])
+        return {
+            'route': route,
+            'requests': len(latencies),
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries_per_request': sum(results['queries']) / max(len(results['queries']), 1),
+            'requests_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+            'errors': results['errors'],
+        }
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--cart-items', type=int, default=5, help='cart lines per customer')
+    parser.add_argument('--wishlist-items', type=int, default=5, help='wishlist entries per customer')
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=100, help='requests per thread per route')
+    parser.add_argument('--gateway-ms', type=float, default=50, help='stub Khalti latency')
+    parser.add_argument('--routes', default=','.join(ROUTES), help='comma-separated subset of ' + ', '.join(ROUTES))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='PATH', help='also write the results to PATH')
+    args = parser.parse_args()
+    args.customers = max(args.customers, ADMIN_ID)
+
+    path = os.path.join(tempfile.mkdtemp(prefix='sajilo-bench-'), 'storefront.sqlite3')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'WTF_CSRF_ENABLED': False,
+                      'KHALTI_ASYNC_VERIFY': False})
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        seed(args, random.Random(args.seed))
+        print(f'Seeded in {time.perf_counter() - started:.1f}s ({path})')
+        harness = Harness(app, args)
+    app.extensions['khalti'] = StubGateway(args.gateway_ms / 1000)
+
+    print(f'{"route":<14}{"reqs":>7}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"queries":>9}{"req/s":>9}{"errors":>8}')
+    report = []
+    for route in args.routes.split(','):
+        row = harness.run(route.strip())
+        report.append(row)
+        print(f'{row["route"]:<14}{row["requests"]:>7}{row["p50_ms"]:>9.1f}{row["p95_ms"]:>9.1f}'
+              f'{row["p99_ms"]:>9.1f}{row["queries_per_request"]:>9.1f}{row["requests_per_sec"]:>9.0f}'
+              f'{row["errors"]:>8}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'commit': current_commit(), 'args': vars(args), 'results': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Add product full-text search index
+
+Revision ID: 17f531fdc14d
+Revises: 64d344d35d3a
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '17f531fdc14d'
+down_revision = '64d344d35d3a'
+branch_labels = None
+depends_on = None
+
+
+# FTS5 is SQLite-only; other databases keep using the ILIKE fallback in
+# website/search.py. The triggers live on `product`, so a batch migration that
+# recreates that table has to run this upgrade again afterwards.
+STATEMENTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        product_name, content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS product_search_ai AFTER INSERT ON product BEGIN
+        INSERT INTO product_search(rowid, product_name) VALUES (new.id, new.product_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_search_ad AFTER DELETE ON product BEGIN
+        INSERT INTO product_search(product_search, rowid, product_name)
+        VALUES ('delete', old.id, old.product_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_search_au AFTER UPDATE OF product_name ON product BEGIN
+        INSERT INTO product_search(product_search, rowid, product_name)
+        VALUES ('delete', old.id, old.product_name);
+        INSERT INTO product_search(rowid, product_name) VALUES (new.id, new.product_name);
+    END""",
+    "INSERT INTO product_search(product_search) VALUES ('rebuild')",
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for statement in STATEMENTS:
+        op.execute(sa.text(statement))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER IF EXISTS product_search_au')
+    op.execute('DROP TRIGGER IF EXISTS product_search_ad')
+    op.execute('DROP TRIGGER IF EXISTS product_search_ai')
+    op.execute('DROP TABLE IF EXISTS product_search')
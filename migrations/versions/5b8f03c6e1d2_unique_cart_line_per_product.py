@@ -0,0 +1,41 @@
+"""Make cart lines unique per customer and product
+
+Revision ID: 5b8f03c6e1d2
+Revises: c41e9b27d6f3
+Create Date: 2026-10-18 16:10:42.093114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8f03c6e1d2'
+down_revision = 'c41e9b27d6f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Fold duplicate lines into the oldest one and drop empty lines so the
+    # unique index can be built.
+    op.execute("""
+        UPDATE cart SET quantity = (
+            SELECT SUM(other.quantity) FROM cart AS other
+            WHERE other.customer_link = cart.customer_link AND other.product_link = cart.product_link
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart GROUP BY customer_link, product_link HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM cart WHERE id NOT IN (
+            SELECT MIN(id) FROM cart GROUP BY customer_link, product_link
+        )
+    """)
+    op.execute("DELETE FROM cart WHERE quantity <= 0")
+    op.create_index('uq_cart_customer_link_product_link', 'cart', ['customer_link', 'product_link'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_cart_customer_link_product_link', table_name='cart')
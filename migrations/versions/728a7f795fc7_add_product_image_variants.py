@@ -0,0 +1,26 @@
+"""Add image_variants to product
+
+Revision ID: 728a7f795fc7
+Revises: aef3e6494b67
+Create Date: 2026-10-18 12:20:05.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '728a7f795fc7'
+down_revision = 'aef3e6494b67'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # op.add_column rather than batch_alter_table: SQLite can add a nullable
+    # column in place, which keeps the product_search triggers intact.
+    op.add_column('product', sa.Column('image_variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('product', 'image_variants')
@@ -0,0 +1,30 @@
+"""Make wishlist entries unique per customer and product
+
+Revision ID: 9d27a4f0b6c8
+Revises: 5b8f03c6e1d2
+Create Date: 2026-10-18 16:48:05.662370
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d27a4f0b6c8'
+down_revision = '5b8f03c6e1d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the oldest entry of any duplicates so the unique index can be built
+    op.execute("""
+        DELETE FROM wishlist WHERE id NOT IN (
+            SELECT MIN(id) FROM wishlist GROUP BY customer_id, product_id
+        )
+    """)
+    op.create_index('uq_wishlist_customer_id_product_id', 'wishlist', ['customer_id', 'product_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_wishlist_customer_id_product_id', table_name='wishlist')
@@ -0,0 +1,58 @@
+"""Add sales rollup tables and order date
+
+Revision ID: a5ccd3a7f578
+Revises: 728a7f795fc7
+Create Date: 2026-10-18 13:41:09.553180
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5ccd3a7f578'
+down_revision = '728a7f795fc7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing orders keep a NULL date; `flask reports rebuild` backfills the
+    # product and category rollups from them.
+    op.add_column('order', sa.Column('date_created', sa.DateTime(), nullable=True))
+
+    op.create_table('daily_sales',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('product_sales',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('product_name', sa.String(length=100), nullable=True),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('product_id')
+    )
+    op.create_index('ix_product_sales_revenue', 'product_sales', ['revenue'], unique=False)
+    op.create_index('ix_product_sales_units', 'product_sales', ['units'], unique=False)
+    op.create_table('category_sales',
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('category_name', sa.String(length=100), nullable=True),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('category_id')
+    )
+
+
+def downgrade():
+    op.drop_table('category_sales')
+    op.drop_index('ix_product_sales_units', table_name='product_sales')
+    op.drop_index('ix_product_sales_revenue', table_name='product_sales')
+    op.drop_table('product_sales')
+    op.drop_table('daily_sales')
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('date_created')
@@ -0,0 +1,30 @@
+"""Add order indexes for the admin order view
+
+Revision ID: a88c780e22ae
+Revises: a5ccd3a7f578
+Create Date: 2026-10-18 14:32:51.207764
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a88c780e22ae'
+down_revision = 'a5ccd3a7f578'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_order_status', 'order', ['status'], unique=False)
+    op.create_index('ix_order_customer_link', 'order', ['customer_link'], unique=False)
+    op.create_index('ix_order_product_link', 'order', ['product_link'], unique=False)
+    op.create_index('ix_order_date_created', 'order', ['date_created'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_order_date_created', table_name='order')
+    op.drop_index('ix_order_product_link', table_name='order')
+    op.drop_index('ix_order_customer_link', table_name='order')
+    op.drop_index('ix_order_status', table_name='order')
@@ -0,0 +1,30 @@
+"""Add product listing indexes for keyset pagination
+
+Revision ID: aef3e6494b67
+Revises: 17f531fdc14d
+Create Date: 2026-10-18 11:02:47.915530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'aef3e6494b67'
+down_revision = '17f531fdc14d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain CREATE INDEX (no batch mode) so the product table, and the search
+    # triggers attached to it, are left in place.
+    op.create_index('ix_product_category_id_date_added', 'product', ['category_id', 'date_added'], unique=False)
+    op.create_index('ix_product_flash_sale_date_added', 'product', ['flash_sale', 'date_added'], unique=False)
+    op.create_index('ix_product_date_added', 'product', ['date_added'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_product_date_added', table_name='product')
+    op.drop_index('ix_product_flash_sale_date_added', table_name='product')
+    op.drop_index('ix_product_category_id_date_added', table_name='product')
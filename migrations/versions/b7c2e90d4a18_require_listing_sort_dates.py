@@ -0,0 +1,46 @@
+"""Make the keyset sort dates on products and contact messages NOT NULL
+
+Revision ID: b7c2e90d4a18
+Revises: f3b8d61e2a47
+Create Date: 2026-10-18 21:04:11.532904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from website.search import create_search_index
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c2e90d4a18'
+down_revision = 'f3b8d61e2a47'
+branch_labels = None
+depends_on = None
+
+# Rows with no date sort after everything else in the newest-first listings,
+# which is where SQLite already put them.
+UNKNOWN_DATE = '1970-01-01 00:00:00.000000'
+
+
+def _restore_search_index():
+    # The batch rebuild of `product` drops the FTS triggers from 17f531fdc14d
+    if op.get_bind().dialect.name == 'sqlite':
+        create_search_index(op.get_bind())
+
+
+def upgrade():
+    op.execute(f"UPDATE product SET date_added = '{UNKNOWN_DATE}' WHERE date_added IS NULL")
+    op.execute(f"UPDATE contact_message SET date_submitted = '{UNKNOWN_DATE}' WHERE date_submitted IS NULL")
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.alter_column('date_added', existing_type=sa.DateTime(), nullable=False)
+    with op.batch_alter_table('contact_message', schema=None) as batch_op:
+        batch_op.alter_column('date_submitted', existing_type=sa.DateTime(), nullable=False)
+    _restore_search_index()
+
+
+def downgrade():
+    with op.batch_alter_table('contact_message', schema=None) as batch_op:
+        batch_op.alter_column('date_submitted', existing_type=sa.DateTime(), nullable=True)
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.alter_column('date_added', existing_type=sa.DateTime(), nullable=True)
+    _restore_search_index()
@@ -0,0 +1,29 @@
+"""Add read state and date indexes to contact messages
+
+Revision ID: c41e9b27d6f3
+Revises: a88c780e22ae
+Create Date: 2026-10-18 15:02:37.418925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e9b27d6f3'
+down_revision = 'a88c780e22ae'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('contact_message', sa.Column('is_read', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.create_index('ix_contact_message_date_submitted', 'contact_message', ['date_submitted'], unique=False)
+    op.create_index('ix_contact_message_is_read_date_submitted', 'contact_message', ['is_read', 'date_submitted'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_contact_message_is_read_date_submitted', table_name='contact_message')
+    op.drop_index('ix_contact_message_date_submitted', table_name='contact_message')
+    with op.batch_alter_table('contact_message', schema=None) as batch_op:
+        batch_op.drop_column('is_read')
@@ -0,0 +1,34 @@
+"""Store background payment verifications in the database
+
+Revision ID: c8e14a7b3f05
+Revises: b7c2e90d4a18
+Create Date: 2026-10-18 22:31:47.105264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e14a7b3f05'
+down_revision = 'b7c2e90d4a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payment_verification',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('success', sa.Boolean(), nullable=True),
+    sa.Column('message', sa.String(length=255), nullable=True),
+    sa.Column('date_created', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_payment_verification_date_created'), 'payment_verification', ['date_created'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_payment_verification_date_created'), table_name='payment_verification')
+    op.drop_table('payment_verification')
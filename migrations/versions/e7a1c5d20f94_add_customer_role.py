@@ -0,0 +1,27 @@
+"""Add a role to customers
+
+Revision ID: e7a1c5d20f94
+Revises: 9d27a4f0b6c8
+Create Date: 2026-10-18 18:02:41.318904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a1c5d20f94'
+down_revision = '9d27a4f0b6c8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('customer', sa.Column('role', sa.String(length=20), nullable=False, server_default='customer'))
+    # Customer 3 was the hard-coded admin account before roles existed
+    op.execute("UPDATE customer SET role = 'admin' WHERE id = 3")
+
+
+def downgrade():
+    with op.batch_alter_table('customer', schema=None) as batch_op:
+        batch_op.drop_column('role')
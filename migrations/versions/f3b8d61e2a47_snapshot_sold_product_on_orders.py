@@ -0,0 +1,36 @@
+"""Keep the sold product and category on each order
+
+Revision ID: f3b8d61e2a47
+Revises: e7a1c5d20f94
+Create Date: 2026-10-18 19:12:36.204117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d61e2a47'
+down_revision = 'e7a1c5d20f94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('order', sa.Column('sold_product_id', sa.Integer(), nullable=True))
+    op.add_column('order', sa.Column('sold_category_id', sa.Integer(), nullable=True))
+
+    order = sa.table('order', sa.column('product_link', sa.Integer()),
+                     sa.column('sold_product_id', sa.Integer()), sa.column('sold_category_id', sa.Integer()))
+    product = sa.table('product', sa.column('id', sa.Integer()), sa.column('category_id', sa.Integer()))
+    op.execute(order.update().values(
+        sold_product_id=order.c.product_link,
+        sold_category_id=sa.select(product.c.category_id)
+        .where(product.c.id == order.c.product_link).scalar_subquery(),
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('sold_category_id')
+        batch_op.drop_column('sold_product_id')
@@ -0,0 +1,18 @@
+import pytest
+
+from website import create_app, db
+from website.models import Category
+
+
+@pytest.fixture
+def app(tmp_path):
+    # A file database rather than the in-memory default, so threads share it
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.sqlite3"}'}, profile='testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add(Category(id=1, name='Phones'))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,49 @@
+from sqlalchemy import event
+
+from website import db
+from website.models import Cart, Customer, Product
+
+
+def add_products(count, in_stock=100):
+    db.session.add_all(Product(id=i, product_name=f'Phone {i}', current_price=10.0 * i, previous_price=20.0 * i,
+                               in_stock=in_stock, flash_sale=False, category_id=1)
+                       for i in range(1, count + 1))
+    db.session.commit()
+
+
+def add_customers(count):
+    db.session.add_all(Customer(id=i, email=f'customer{i}@example.com', username=f'customer{i}')
+                       for i in range(1, count + 1))
+    db.session.commit()
+
+
+def fill_cart(customer_id, product_ids, quantity=1):
+    db.session.add_all(Cart(customer_link=customer_id, product_link=product_id, quantity=quantity)
+                       for product_id in product_ids)
+    db.session.commit()
+
+
+def logged_in_client(app, customer_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(customer_id)
+        session['_fresh'] = True
+    return client
+
+
+class QueryCounter:
+    """Counts the statements the app's engine runs while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _count(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._count)
@@ -0,0 +1,46 @@
+import pytest
+
+from website import db
+from website.models import Cart
+from .factories import QueryCounter, add_customers, add_products, fill_cart, logged_in_client
+
+
+# With the session principal cached: the cart lines, the totals aggregate and
+# the navbar badge counts for /cart; the UPDATE ... RETURNING and the totals
+# for /pluscart.
+CART_PAGE_QUERIES = 3
+PLUSCART_QUERIES = 2
+
+
+def _queries(app, client, path):
+    with app.app_context():
+        engine = db.engine
+    client.get(path)  # warm the principal cache
+    with QueryCounter(engine) as counter:
+        response = client.get(path)
+    assert response.status_code == 200
+    return counter.count
+
+
+@pytest.fixture
+def carts(app):
+    """Customer 1 has one item in the cart, customer 2 has thirty."""
+    with app.app_context():
+        add_products(30)
+        add_customers(2)
+        fill_cart(1, [1])
+        fill_cart(2, range(1, 31))
+        return {customer_id: db.session.query(Cart.id).filter_by(customer_link=customer_id).first()[0]
+                for customer_id in (1, 2)}
+
+
+def test_cart_page_queries_do_not_grow_with_items(app, carts):
+    small = _queries(app, logged_in_client(app, 1), '/cart')
+    large = _queries(app, logged_in_client(app, 2), '/cart')
+    assert small == large == CART_PAGE_QUERIES
+
+
+def test_pluscart_queries_do_not_grow_with_items(app, carts):
+    small = _queries(app, logged_in_client(app, 1), f'/pluscart?cart_id={carts[1]}')
+    large = _queries(app, logged_in_client(app, 2), f'/pluscart?cart_id={carts[2]}')
+    assert small == large == PLUSCART_QUERIES
@@ -0,0 +1,42 @@
+import io
+import sys
+
+from website import db
+from website.cache import get_categories
+from website.catalog import _open, load_category_map, read_rows
+from website.models import Product
+
+
+JSONL = '\n'.join([
+    '{"product_name": "Phone A", "current_price": 100, "category": "Phones"}',
+    '{"product_name": "Phone B", "current_price": ',  # truncated line
+    '[1, 2, 3]',
+    '"just a string"',
+    '{"product_name": "Phone C", "current_price": 300, "category": "Tablets"}',
+]) + '\n'
+
+
+def test_import_skips_malformed_jsonl_records(app):
+    result = app.test_cli_runner().invoke(args=['catalog', 'import', '-', '--format', 'jsonl'], input=JSONL)
+
+    assert result.exit_code == 0, result.output
+    assert 'record 2 skipped: invalid JSON' in result.output
+    assert 'record 3 skipped: expected an object, got list' in result.output
+    assert 'record 4 skipped: expected an object, got str' in result.output
+    assert '3 records skipped.' in result.output
+    with app.app_context():
+        assert sorted(db.session.scalars(db.select(Product.product_name))) == ['Phone A', 'Phone C']
+
+
+def test_stdin_stays_open(monkeypatch):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(JSONL))
+    with _open('-', 'r') as stream:
+        assert len(list(read_rows(stream, 'jsonl'))) == 5
+    assert not sys.stdin.closed
+
+
+def test_new_categories_reach_the_cached_list(app):
+    with app.app_context():
+        assert [c['name'] for c in get_categories()] == ['Phones']
+        load_category_map(create_from=['Tablets'])
+        assert [c['name'] for c in get_categories()] == ['Phones', 'Tablets']
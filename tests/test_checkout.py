@@ -0,0 +1,56 @@
+import threading
+
+from sqlalchemy import func, select
+
+from website import db
+from website.checkout import OutOfStock, checkout_cart
+from website.models import Cart, Order, Product
+from .factories import add_customers, add_products, fill_cart
+
+
+def test_parallel_checkouts_never_oversell(app):
+    carts, stock = 30, 10
+    with app.app_context():
+        add_products(1, in_stock=stock)
+        add_customers(carts)
+        for customer_id in range(1, carts + 1):
+            fill_cart(customer_id, [1])
+
+    results, lock = {}, threading.Lock()
+    start = threading.Barrier(carts)
+
+    def checkout(customer_id):
+        with app.app_context():
+            start.wait()
+            try:
+                checkout_cart(customer_id, f'payment-{customer_id}')
+                outcome = 'ok'
+            except OutOfStock:
+                outcome = 'out of stock'
+            except Exception as error:
+                outcome = repr(error)
+            finally:
+                db.session.remove()
+        with lock:
+            results[customer_id] = outcome
+
+    threads = [threading.Thread(target=checkout, args=(i,)) for i in range(1, carts + 1)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    succeeded = {i for i, outcome in results.items() if outcome == 'ok'}
+    rejected = {i for i, outcome in results.items() if outcome == 'out of stock'}
+    assert len(succeeded) == stock
+    assert len(rejected) == carts - stock
+
+    with app.app_context():
+        assert db.session.get(Product, 1).in_stock == 0
+        ordered = set(db.session.scalars(select(Order.customer_link)))
+        assert ordered == succeeded
+        assert db.session.scalar(select(func.count()).select_from(Order)) == stock
+        # A rejected checkout rolls back, leaving the cart as it was
+        restored = {row.customer_link: row.quantity for row in db.session.execute(
+            select(Cart.customer_link, Cart.quantity))}
+        assert restored == {i: 1 for i in rejected}
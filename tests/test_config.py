@@ -0,0 +1,17 @@
+import pytest
+
+from website.config import DevelopmentConfig, ProductionConfig, get_config
+
+
+def test_unset_profile_means_production(monkeypatch):
+    monkeypatch.delenv('SAJILO_CONFIG', raising=False)
+    assert get_config() is ProductionConfig
+    assert not ProductionConfig.SERVER_TIMING
+    assert ProductionConfig.TRUSTED_PROXIES == 0  # X-Forwarded-For is only trusted on request
+
+
+def test_profile_from_environment(monkeypatch):
+    monkeypatch.setenv('SAJILO_CONFIG', 'development')
+    assert get_config() is DevelopmentConfig
+    with pytest.raises(ValueError):
+        get_config('staging')
@@ -0,0 +1,28 @@
+from PIL import Image
+
+from website import create_app, db
+from website.models import Product
+from .factories import add_products
+
+
+def test_rebuild_backfills_missing_variants(app, tmp_path):
+    media = tmp_path / 'media'
+    media.mkdir()
+    Image.new('RGB', (1600, 900), (200, 30, 30)).save(media / 'iphone 16 pro max.png')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'],
+                      'MEDIA_FOLDER': str(media)}, profile='testing')
+    with app.app_context():
+        add_products(2)
+        db.session.get(Product, 1).product_picture = './media/iphone 16 pro max.png'
+        db.session.get(Product, 2).product_picture = './media/gone.png'
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['images', 'rebuild'])
+
+    assert result.exit_code == 0, result.output
+    assert '1 products updated, 1 failed' in result.output
+    with app.app_context():
+        variants = db.session.get(Product, 1).image_variants
+        assert variants['large']['width'] == 1200
+        assert (media / 'iphone 16 pro max-thumb.webp').exists()
+        assert db.session.get(Product, 2).image_variants is None
@@ -0,0 +1,42 @@
+from website import create_app, db
+from website.metrics import REQUEST_LATENCY
+from website.models import ROLE_ADMIN, Customer
+from .factories import add_customers, logged_in_client
+
+
+def _admin_app(app, **config):
+    with app.app_context():
+        add_customers(2)
+        db.session.get(Customer, 1).role = ROLE_ADMIN
+        db.session.commit()
+    if not config:
+        return app
+    return create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], **config},
+                      profile='testing')
+
+
+def test_metrics_are_admin_only_without_a_token(app):
+    app = _admin_app(app)
+    assert app.test_client().get('/metrics').status_code == 403
+    assert logged_in_client(app, 2).get('/metrics').status_code == 403
+    assert logged_in_client(app, 1).get('/metrics').status_code == 200
+
+
+def test_metrics_token_is_required_when_set(app):
+    app = _admin_app(app, METRICS_TOKEN='secret')
+    assert logged_in_client(app, 1).get('/metrics').status_code == 401
+    response = app.test_client().get('/metrics', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert 'sajilo_http_requests_total' in response.get_data(as_text=True)
+
+
+def test_each_request_is_timed_once(app):
+    app = _admin_app(app)
+    admin = logged_in_client(app, 1)
+    admin.get('/admin/metrics?reset=1')
+    for _ in range(3):
+        admin.get('/about')
+    assert REQUEST_LATENCY.collect()[('auth', 'auth.about_us')][-1] == 3
+    about = admin.get('/admin/metrics').get_json()['endpoints']['auth.about_us']
+    assert about['requests'] == 3
+    assert sum(bucket['count'] for bucket in about['latency_ms']) == 3
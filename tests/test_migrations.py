@@ -0,0 +1,25 @@
+import os
+
+from flask_migrate import downgrade, stamp, upgrade
+
+from website import db
+from website.models import Product
+from website.search import create_search_index, search_products
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations')
+
+
+def test_product_rebuild_keeps_search_triggers(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            create_search_index(connection)
+        stamp(MIGRATIONS, 'head')
+        # b7c2e90d4a18 rebuilds `product` on SQLite in both directions
+        downgrade(MIGRATIONS, 'f3b8d61e2a47')
+        upgrade(MIGRATIONS)
+
+        triggers = db.session.scalars(db.text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).all()
+        assert sorted(triggers) == ['product_search_ad', 'product_search_ai', 'product_search_au']
+        db.session.add(Product(product_name='blue laptop', current_price=900, in_stock=1, category_id=1))
+        db.session.commit()
+        assert [product.product_name for product in search_products('blue')] == ['blue laptop']
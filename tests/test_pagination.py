@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from website import db
+from website.models import Product
+from website.pagination import keyset_page
+
+from .factories import add_products
+
+
+def test_keyset_pages_reach_every_product(app):
+    with app.app_context():
+        add_products(7)
+        same_time = datetime(2026, 1, 1)
+        for product in Product.query:
+            # Ties on the sort key are broken by id.
+            product.date_added = same_time if product.id % 2 else same_time + timedelta(days=product.id)
+        db.session.commit()
+
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(Product.query, Product.date_added, Product.id, cursor=cursor,
+                               per_page=3, descending=True)
+            seen += [product.id for product in page.items]
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        assert seen == [6, 4, 2, 7, 5, 3, 1]
+
+
+def test_product_date_added_is_required(app):
+    with app.app_context():
+        add_products(1)
+        with pytest.raises(IntegrityError):
+            db.session.execute(db.update(Product).values(date_added=None))
@@ -0,0 +1,14 @@
+from website.passwords import PasswordPolicy
+
+
+def test_verify_rehashes_only_outdated_hashes():
+    old = PasswordPolicy('pbkdf2:sha256:1000', workers=1)
+    new = PasswordPolicy('pbkdf2:sha256:2000', workers=1)
+    stored = old.hash('secret')
+
+    assert new.needs_rehash(stored)
+    assert new.verify(stored, 'wrong') == (False, None)
+    matches, new_hash = new.verify(stored, 'secret')
+    assert matches and new_hash.startswith('pbkdf2:sha256:2000$')
+    assert not new.needs_rehash(new_hash)
+    assert new.verify(new_hash, 'secret') == (True, None)
@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from website import create_app
+from website.payments import KhaltiClient, PaymentGatewayError, submit_verification, verification_status
+
+from .factories import add_customers
+
+
+class KhaltiStub(ThreadingHTTPServer):
+    """Local stand-in for the Khalti verify endpoint, replying from a script of (status, delay)."""
+
+    def __init__(self, replies):
+        super().__init__(('127.0.0.1', 0), _StubHandler)
+        self.replies = list(replies)
+        self.requests = []
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/verify/'
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append((dict(self.headers), body.decode()))
+        status, delay = self.server.replies.pop(0) if self.server.replies else (200, 0)
+        time.sleep(delay)
+        payload = json.dumps({'idx': 'paid-1'} if status == 200 else {'detail': 'busy'}).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except ConnectionError:
+            pass  # the client gave up waiting
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def khalti(monkeypatch):
+    monkeypatch.setenv('NO_PROXY', '127.0.0.1')
+    servers = []
+
+    def start(*replies):
+        server = KhaltiStub(replies)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_client_sends_the_secret_key_and_retries_503(khalti):
+    server = khalti((503, 0), (200, 0))
+    client = KhaltiClient('test_secret', verify_url=server.url, retries=2)
+
+    assert client.verify('token-1', 1000) is True
+    assert len(server.requests) == 2
+    headers, body = server.requests[-1]
+    assert headers['Authorization'] == 'Key test_secret'
+    assert body == 'token=token-1&amount=1000'
+
+
+def test_client_gives_up_after_its_retries(khalti):
+    server = khalti((503, 0), (503, 0), (503, 0))
+    client = KhaltiClient('test_secret', verify_url=server.url, retries=1)
+
+    assert client.verify('token-1', 1000) is False
+    assert len(server.requests) == 2
+
+
+def test_client_timeout_is_a_gateway_error(khalti):
+    server = khalti((200, 1), (200, 1))
+    client = KhaltiClient('test_secret', verify_url=server.url, timeout=(1, 0.2), retries=0)
+
+    with pytest.raises(PaymentGatewayError):
+        client.verify('token-1', 1000)
+
+
+def test_verification_status_is_visible_to_other_workers(app, khalti):
+    server = khalti((503, 0), (503, 0), (503, 0))
+    app.config.update(KHALTI_VERIFY_URL=server.url, KHALTI_RETRIES=0)
+    # Another worker process: its own app object over the same database
+    other = create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI']}, profile='testing')
+    with app.app_context():
+        add_customers(2)
+        job_id = submit_verification(1, 'token-1', 1000)
+
+    with other.app_context():
+        deadline = time.monotonic() + 5
+        while verification_status(job_id, 1) == {'status': 'pending'} and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert verification_status(job_id, 1) == {'status': 'done', 'success': False,
+                                                  'message': 'Payment verification failed'}
+        assert verification_status(job_id, 2) is None
@@ -0,0 +1,70 @@
+from website import create_app, db
+from website.cache import MemoryCache
+from website.models import ROLE_ADMIN, ROLE_CUSTOMER, Customer, Order
+from website.principal import forget_principal, load_principal
+from .factories import add_customers, add_products, logged_in_client
+
+
+def test_admin_routes_follow_the_role(app):
+    with app.app_context():
+        add_customers(2)
+        db.session.get(Customer, 1).role = ROLE_ADMIN
+        db.session.commit()
+    assert logged_in_client(app, 1).get('/cache-stats').status_code == 200
+    assert logged_in_client(app, 2).get('/cache-stats').status_code == 403
+    assert app.test_client().get('/cache-stats').status_code == 302
+
+
+def test_orders_are_only_deleted_by_post(app):
+    with app.app_context():
+        add_customers(1)
+        add_products(1)
+        db.session.get(Customer, 1).role = ROLE_ADMIN
+        db.session.add(Order(id=1, quantity=1, price=10.0, status='Pending', payment_id='p1', customer_link=1,
+                             product_link=1, sold_product_id=1, sold_category_id=1))
+        db.session.commit()
+    client = logged_in_client(app, 1)
+    assert client.get('/delete-order/1').status_code == 405
+    assert client.post('/delete-order/1').status_code == 302
+    with app.app_context():
+        assert db.session.get(Order, 1) is None
+
+
+def test_shared_backend_reaches_every_worker(app):
+    """Two apps on one database stand in for two web workers."""
+    shared = MemoryCache()
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    workers = [create_app({'SQLALCHEMY_DATABASE_URI': uri, 'PRINCIPAL_CACHE_BACKEND': shared}, profile='testing')
+               for _ in range(2)]
+    with app.app_context():
+        add_customers(1)
+        db.session.get(Customer, 1).role = ROLE_ADMIN
+        db.session.commit()
+    with workers[0].app_context():
+        assert load_principal(1).is_admin
+
+    with workers[1].app_context():
+        db.session.get(Customer, 1).role = ROLE_CUSTOMER
+        db.session.commit()
+        forget_principal(1)
+    with workers[0].app_context():
+        assert not load_principal(1).is_admin
+
+
+
+def test_account_pages_load_the_logged_in_customer(app):
+    with app.app_context():
+        add_customers(2)
+        db.session.get(Customer, 1).password = 'old-password'
+        db.session.commit()
+    client = logged_in_client(app, 1)
+    assert client.get('/profile/1').status_code == 200
+    assert client.get('/profile/2').status_code == 404
+    assert client.get('/change-password/2').status_code == 404
+
+    response = client.post('/change-password/1', data={'current_password': 'old-password',
+                                                       'new_password': 'new-password',
+                                                       'confirm_new_password': 'new-password'})
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.get(Customer, 1).verify_password('new-password')
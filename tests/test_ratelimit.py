@@ -0,0 +1,38 @@
+import pytest
+
+from website import create_app
+from website.ratelimit import MemoryBuckets
+
+
+def _limited_app(app, **config):
+    return create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'RATE_LIMIT_ENABLED': True,
+                       'RATE_LIMITS': {'login': {'ip': (2, 60)}}, **config}, profile='testing')
+
+
+def _login(client, forwarded_for):
+    return client.post('/login', data={'email': 'nobody@example.com', 'password': 'wrong'},
+                       headers={'X-Forwarded-For': forwarded_for},
+                       environ_base={'REMOTE_ADDR': '10.0.0.1'}).status_code  # the proxy
+
+
+def test_clients_behind_a_trusted_proxy_get_their_own_bucket(app):
+    client = _limited_app(app, TRUSTED_PROXIES=1).test_client()
+    assert [_login(client, '203.0.113.7') for _ in range(3)] == [200, 200, 429]
+    assert _login(client, '198.51.100.2') == 200
+
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(app):
+    client = _limited_app(app).test_client()
+    assert [_login(client, f'203.0.113.{i}') for i in range(3)] == [200, 200, 429]
+
+
+def test_token_bucket_refills_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('website.ratelimit.time.monotonic', lambda: now[0])
+    buckets = MemoryBuckets(max_keys=2)
+    assert [buckets.take('a', 2, 1.0) for _ in range(3)] == [0.0, 0.0, pytest.approx(1.0)]
+    now[0] += 1
+    assert buckets.take('a', 2, 1.0) == 0.0
+    buckets.take('b', 2, 1.0)
+    buckets.take('c', 2, 1.0)
+    assert len(buckets) == 2
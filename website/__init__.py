@@ -1,23 +1,50 @@
+import logging
+
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.middleware.proxy_fix import ProxyFix
+from .config import get_config, engine_options, configure_sqlite
 
 db = SQLAlchemy()
-DB_NAME = 'database.sqlite3'
+logger = logging.getLogger(__name__)
+
+
+def upsert_insert(table):
+    """INSERT for `table` that supports ON CONFLICT, or None if the database has no such clause.
+
+    Callers fall back to plain UPDATE/INSERT statements when this returns None.
+    """
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(db.session.get_bind().dialect.name)
+    return dialect.insert(table) if dialect is not None else None
 
 
 def create_database():
     db.create_all()
-    print('Database Created')
+    logger.info('Database created')
 
 
-def create_app():
+def create_app(config=None, profile=None):
     app = Flask(__name__)
-    app.config['SECRET_KEY'] = 'willofD'
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_NAME}'
+    # Profile from $SAJILO_CONFIG (development/production/testing), see config.py
+    app.config.from_object(get_config(profile))
+    if config:
+        app.config.update(config)  # overrides for scripts and benchmarks
+    from .logs import init_logging
+    init_logging(app)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    if app.config['TRUSTED_PROXIES']:
+        # Client address and scheme from the proxy headers (rate limits, logs)
+        proxies = app.config['TRUSTED_PROXIES']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
 
     db.init_app(app)
+    from .instrumentation import init_instrumentation
+    with app.app_context():
+        configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        init_instrumentation(app, db.engine)
     migrate = Migrate(app, db)
 
     from .models import Customer, Cart, Wishlist, Product, Order  # Import all needed models
@@ -26,21 +53,41 @@ def create_app():
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
 
+    from .principal import init_principals, load_principal
+    init_principals(app)
+    from .passwords import init_passwords
+    init_passwords(app)
+    from .ratelimit import init_rate_limits
+    init_rate_limits(app)
+
     @login_manager.user_loader
     def load_user(id):
-        return Customer.query.get(int(id))
+        # A cached SessionPrincipal, not the Customer row (see principal.py)
+        return load_principal(int(id))
 
     @app.errorhandler(404)
     def page_not_found(error):
-        return render_template('404.html')
+        return render_template('404.html'), 404
+
+    from .cache import init_catalog_cache
+    init_catalog_cache(app)
+
+    from .metrics import init_metrics
+    init_metrics(app)
+
+    from .images import product_image, product_srcset
+    from .media import media_url
+    from .pagination import page_url
+    app.jinja_env.globals.update(product_image=product_image, product_srcset=product_srcset, media_url=media_url,
+                                 page_url=page_url)
 
     # ✅ Global template variables
     @app.context_processor
     def inject_cart_wishlist_counts():
         from flask_login import current_user
+        from .badges import get_badge_counts
         if current_user.is_authenticated:
-            cart_count = sum(item.quantity for item in Cart.query.filter_by(customer_link=current_user.id).all())
-            wishlist_count = Wishlist.query.filter_by(customer_id=current_user.id).count()
+            cart_count, wishlist_count = get_badge_counts(current_user.id)
         else:
             cart_count = 0
             wishlist_count = 0
@@ -51,37 +98,14 @@ def create_app():
     from .auth import auth
     from .admin import admin
 
-    app.register_blueprint(views, url_prefix='/')
-    app.register_blueprint(auth, url_prefix='/')
-    app.register_blueprint(admin, url_prefix='/')
-
-    return app
-
-    app = Flask(__name__)
-    app.config['SECRET_KEY'] = 'willofD'
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_NAME}'
-
-    db.init_app(app)
-
-    # Initialize Flask-Migrate with app and db
-    migrate = Migrate(app, db)
-
-    @app.errorhandler(404)
-    def page_not_found(error):
-        return render_template('404.html')
-
-    login_manager = LoginManager()
-    login_manager.init_app(app)
-    login_manager.login_view = 'auth.login'
-
-    @login_manager.user_loader
-    def load_user(id):
-        return Customer.query.get(int(id))
-
-    from .views import views
-    from .auth import auth
-    from .admin import admin
-    from .models import Customer, Cart, Product, Order
+    from .reports import reports_cli
+    app.cli.add_command(reports_cli)
+    from .catalog import catalog_cli
+    app.cli.add_command(catalog_cli)
+    from .principal import roles_cli
+    app.cli.add_command(roles_cli)
+    from .images import images_cli
+    app.cli.add_command(images_cli)
 
     app.register_blueprint(views, url_prefix='/')
     app.register_blueprint(auth, url_prefix='/')
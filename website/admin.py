@@ -1,20 +1,30 @@
-from flask import Blueprint, render_template, flash, send_from_directory, redirect,request, url_for
-from flask_login import login_required, current_user
+import logging
+
+from flask import Blueprint, render_template, flash, redirect,request, url_for, jsonify, current_app
 from .forms import ShopItemsForm, OrderForm
-from werkzeug.utils import secure_filename
-from .models import Product, Order, Customer, ContactMessage, Wishlist, Product
+from .models import Product, Order, Customer, ContactMessage, Product
 from . import db
-from datetime import datetime
-import os
+from .pagination import product_page, keyset_page
+from .cache import catalog_cache, invalidate_product
+from .images import save_upload, schedule_variants
+from .media import serve_media
+from .instrumentation import request_stats
+from .principal import admin_required
+from .inbox import INBOX_FILTERS, inbox_counts, daily_counts, inbox_page, mark_messages
+from .reports import record_status_change, sales_summary, top_products, category_breakdown
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 
 
 
 
 
 admin= Blueprint('admin', __name__)
+logger = logging.getLogger(__name__)
 @admin.route('/media/<path:filename>')
 def get_image(filename):
-    return send_from_directory('../media', filename)
+    return serve_media(filename)
 
 
 
@@ -29,139 +39,128 @@ def get_image(filename):
 
 
 @admin.route('/add-shop-items', methods=['GET', 'POST'])
-@login_required
+@admin_required
 def add_shop_items():
-    if current_user.id == 3:
-        form = ShopItemsForm()
-
-        if form.validate_on_submit():
-            product_name = form.product_name.data
-            current_price = form.current_price.data
-            previous_price = form.previous_price.data
-            in_stock = form.in_stock.data
-            flash_sale = form.flash_sale.data
-            category_id = form.category_id.data  # Get the selected category ID
-            
-            file = form.product_picture.data
-            file_name = secure_filename(file.filename)
-            file_path = f'./media/{file_name}'
-            file.save(file_path)
-
-            new_shop_item = Product()
-            new_shop_item.product_name = product_name
-            new_shop_item.current_price = current_price
-            new_shop_item.previous_price = previous_price
-            new_shop_item.in_stock = in_stock
-            new_shop_item.flash_sale = flash_sale
-            new_shop_item.product_picture = file_path
-            new_shop_item.category_id = category_id  # Assign the category_id here
-            
-            try:
-                db.session.add(new_shop_item)
-                db.session.commit()
-                flash(f'{product_name} added successfully', 'success')
-                return render_template('add_shop_items.html', form=form)
-            
-            except Exception as e:
-                print(e)
-                flash('Item not added due to an error.', 'danger')
-                return render_template('add_shop_items.html', form=form)
-        
-        return render_template('add_shop_items.html', form=form)
-    
-    return render_template('404.html')
+    form = ShopItemsForm()
+
+    if form.validate_on_submit():
+        product_name = form.product_name.data
+        current_price = form.current_price.data
+        previous_price = form.previous_price.data
+        in_stock = form.in_stock.data
+        flash_sale = form.flash_sale.data
+        category_id = form.category_id.data  # Get the selected category ID
+
+        file = form.product_picture.data
+        file_path = save_upload(file)  # content-hashed original; variants are built in the background
+
+        new_shop_item = Product()
+        new_shop_item.product_name = product_name
+        new_shop_item.current_price = current_price
+        new_shop_item.previous_price = previous_price
+        new_shop_item.in_stock = in_stock
+        new_shop_item.flash_sale = flash_sale
+        new_shop_item.product_picture = file_path
+        new_shop_item.category_id = category_id  # Assign the category_id here
+
+        try:
+            db.session.add(new_shop_item)
+            db.session.commit()
+            invalidate_product(new_shop_item.id)
+            schedule_variants(new_shop_item.id, file_path)
+            flash(f'{product_name} added successfully', 'success')
+            return render_template('add_shop_items.html', form=form)
+
+        except Exception:
+            logger.exception('Adding product %r failed', product_name)
+            flash('Item not added due to an error.', 'danger')
+            return render_template('add_shop_items.html', form=form)
+
+    return render_template('add_shop_items.html', form=form)
 
 
 
 
 
 @admin.route('/shop-items', methods=['GET', 'POST'])
-@login_required
+@admin_required
 def shop_items():
-    try:
-        if current_user.id == 3:  # Admin check
-            items = Product.query.order_by(Product.date_added).all()
-            print(items)  # Debug: Log items to verify query results
-            return render_template('shop_items.html', items=items)
-        else:
-            print("Unauthorized access. Current user ID:", current_user.id)  # Debug: Log user ID
-            return render_template('404.html')
-    except Exception as e:
-        print("Error in /shop-items route:", e)  # Debug: Log any exceptions
-        return render_template('404.html')
+    page = product_page(Product.query, descending=False)
+    logger.debug('Shop items page', extra={'count': len(page.items), 'has_next': page.has_next})
+    return render_template('shop_items.html', items=page.items, page=page)
 
         
 @admin.route('/update-item/<int:item_id>', methods=['GET', 'POST'])
-@login_required
+@admin_required
 def update_item(item_id):
-    if current_user.id == 3:  # Admin check
-        item_to_update = Product.query.get_or_404(item_id)
-        form = ShopItemsForm(obj=item_to_update)
-        form.category_id.data = item_to_update.category_id
-
-        if form.validate_on_submit():
-            # Form data
-            item_to_update.product_name = form.product_name.data
-            item_to_update.current_price = form.current_price.data
-            item_to_update.previous_price = form.previous_price.data
-            item_to_update.in_stock = form.in_stock.data
-            item_to_update.flash_sale = form.flash_sale.data
-            item_to_update.category_id = form.category_id.data
-
-            # Handle file upload
-            file = form.product_picture.data
-            if file and hasattr(file, 'filename') and file.filename:
-                filename = secure_filename(file.filename)
-                file_path = os.path.join('media', filename)
-                file.save(file_path)
-                item_to_update.product_picture = file_path
-            # else: retain existing image (already in item_to_update.product_picture)
-
-            try:
-                db.session.commit()
-                flash('Product updated successfully!', 'success')
-                return redirect('/shop-items')
-            except Exception as e:
-                db.session.rollback()
-                print("Error:", e)
-                flash('Error updating product. Please try again.', 'danger')
-
-        return render_template('update_item.html', form=form)
-
-    return render_template('404.html')
+    item_to_update = Product.query.get_or_404(item_id)
+    form = ShopItemsForm(obj=item_to_update)
+    form.category_id.data = item_to_update.category_id
+
+    if form.validate_on_submit():
+        # Form data
+        item_to_update.product_name = form.product_name.data
+        item_to_update.current_price = form.current_price.data
+        item_to_update.previous_price = form.previous_price.data
+        item_to_update.in_stock = form.in_stock.data
+        item_to_update.flash_sale = form.flash_sale.data
+        item_to_update.category_id = form.category_id.data
+
+        # Handle file upload
+        file = form.product_picture.data
+        new_picture = None
+        if file and hasattr(file, 'filename') and file.filename:
+            new_picture = save_upload(file)
+            if new_picture != item_to_update.product_picture:
+                item_to_update.product_picture = new_picture
+                item_to_update.image_variants = None
+            else:
+                new_picture = None
+        # else: retain existing image (already in item_to_update.product_picture)
+
+        try:
+            db.session.commit()
+            invalidate_product(item_id)
+            if new_picture:
+                schedule_variants(item_id, new_picture)
+            flash('Product updated successfully!', 'success')
+            return redirect('/shop-items')
+        except Exception:
+            db.session.rollback()
+            logger.exception('Updating product %s failed', item_id)
+            flash('Error updating product. Please try again.', 'danger')
+
+    return render_template('update_item.html', form=form)
 
 
 @admin.route('/delete-item/<int:item_id>', methods=['POST'])
-@login_required
+@admin_required
 def delete_item(item_id):
-    if current_user.id == 3:  # Admin check
-        try:
-            item_to_delete = Product.query.get_or_404(item_id)
-            print(f"Product to delete: {item_to_delete}")  # Debugging
-
-            # Check if any orders are linked to this product
-            related_orders = Order.query.filter_by(product_link=item_id).all()
-            if related_orders:
-                print(f"Found related orders: {related_orders}")
-                # Update the orders to set product_link to NULL
-                Order.query.filter_by(product_link=item_id).update({"product_link": None})
-                db.session.commit()
-                print("Related orders updated to NULL.")
-
-            # Now delete the product
-            db.session.delete(item_to_delete)
+    item_to_delete = Product.query.get_or_404(item_id)
+    try:
+        logger.debug('Deleting product', extra={'product_id': item_id})
+
+        # Check if any orders are linked to this product
+        related_orders = Order.query.filter_by(product_link=item_id).all()
+        if related_orders:
+            logger.debug('Unlinking orders from deleted product',
+                         extra={'product_id': item_id, 'orders': len(related_orders)})
+            # Update the orders to set product_link to NULL
+            Order.query.filter_by(product_link=item_id).update({"product_link": None})
             db.session.commit()
 
-            flash("Item deleted successfully!", "success")
-            print(f"Product {item_id} deleted.")
-        except Exception as e:
-            db.session.rollback()
-            print(f"Error deleting product: {str(e)}")  # Log the full error
-            flash("Failed to delete item.", "danger")
-        return redirect(url_for('admin.shop_items'))
-    else:
-        print(f"Unauthorized access by user ID: {current_user.id}")  # Debugging
-        return render_template('404.html')
+        # Now delete the product
+        db.session.delete(item_to_delete)
+        db.session.commit()
+        invalidate_product(item_id)
+
+        flash("Item deleted successfully!", "success")
+        logger.info('Product deleted', extra={'product_id': item_id})
+    except Exception:
+        db.session.rollback()
+        logger.exception('Deleting product %s failed', item_id)
+        flash("Failed to delete item.", "danger")
+    return redirect(url_for('admin.shop_items'))
 
 
 
@@ -170,78 +169,120 @@ def delete_item(item_id):
 
 
 
+ORDER_STATUSES = ['Paid', 'Pending', 'Accepted', 'Out for delivery', 'Delivered', 'Canceled']
+
+# sort name -> (indexed column, descending, cursor value type); ties broken by id
+ORDER_SORTS = {
+    'newest': (Order.id, True, int),
+    'oldest': (Order.id, False, int),
+    'status': (Order.status, False, str),
+    'customer': (Order.customer_link, False, int),
+}
+
+
+def _filtered_orders(args):
+    """Order query with the status/customer/date filters from the query string applied."""
+    filters = {
+        'status': args.get('status', ''),
+        'customer': args.get('customer', '').strip(),
+        'date_from': args.get('date_from', ''),
+        'date_to': args.get('date_to', ''),
+        'sort': args.get('sort', 'newest'),
+    }
+    query = Order.query.options(joinedload(Order.customer), joinedload(Order.product))
+    if filters['status']:
+        query = query.filter(Order.status == filters['status'])
+    if filters['customer']:
+        if filters['customer'].isdigit():
+            query = query.filter(Order.customer_link == int(filters['customer']))
+        else:
+            customer_ids = select(Customer.id).where(Customer.email == filters['customer'])
+            query = query.filter(Order.customer_link.in_(customer_ids))
+    try:
+        if filters['date_from']:
+            query = query.filter(Order.date_created >= datetime.strptime(filters['date_from'], '%Y-%m-%d'))
+        if filters['date_to']:
+            query = query.filter(Order.date_created < datetime.strptime(filters['date_to'], '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        flash('Dates must be in YYYY-MM-DD format.', 'danger')
+    return query, filters
+
+
 @admin.route('/view-orders')
-@login_required
+@admin_required
 def order_view():
-    if current_user.id == 3:
-        orders = Order.query.all()
-        return render_template('view_orders.html', orders=orders)
-    return render_template('404.html')
+    query, filters = _filtered_orders(request.args)
+    sort_column, descending, value_type = ORDER_SORTS.get(filters['sort'], ORDER_SORTS['newest'])
+    page = keyset_page(query, sort_column, Order.id, cursor=request.args.get('cursor'),
+                       per_page=current_app.config.get('ORDERS_PER_PAGE', 50),
+                       descending=descending, value_type=value_type)
+    return render_template('view_orders.html', orders=page.items, page=page, filters=filters,
+                           statuses=ORDER_STATUSES)
 
 
 
 @admin.route('/update-order/<int:order_id>', methods=['GET', 'POST'])
-@login_required
+@admin_required
 def update_order(order_id):
-    if current_user.id == 3:
-        form = OrderForm()
-        
-        order= Order.query.get(order_id)
-        if form.validate_on_submit():
-            status= form.order_status.data
-            order.status= status
-            
-            try:
-                db.session.commit()
-                flash(f'Order {order_id} updated successfully')
-                return redirect('/view-orders')
-            except Exception as e:
-                print(e)
-                flash (f'Order {order_id} not updated')
-                return redirect ('/view-orders')
-                
-            
-            
+    form = OrderForm()
 
-        return render_template('order_update.html', form=form)
+    order= Order.query.get_or_404(order_id)
+    if form.validate_on_submit():
+        status= form.order_status.data
+        old_status= order.status
+        order.status= status
 
-    return render_template('404.html')
+        try:
+            record_status_change(order, old_status)
+            db.session.commit()
+            flash(f'Order {order_id} updated successfully')
+            return redirect('/view-orders')
+        except Exception:
+            db.session.rollback()
+            logger.exception('Updating order %s failed', order_id)
+            flash (f'Order {order_id} not updated')
+            return redirect ('/view-orders')
+
+    return render_template('order_update.html', form=form)
 
 
 
 
 @admin.route('/customers')
-@login_required
+@admin_required
 def display_customers():
-    if current_user.id == 3:
-        customers = Customer.query.all()
-        return render_template('customers.html', customers=customers)
-    return render_template('404.html')
+    customers = Customer.query.all()
+    return render_template('customers.html', customers=customers)
         
 
 
 @admin.route('/view-messages')
-@login_required
+@admin_required
 def view_messages():
-    if current_user.id == 3:
-        messages = ContactMessage.query.order_by(ContactMessage.date_submitted.desc()).all()
-
-        # Get today's date
-        today = datetime.now().date()
-
-        # Filter messages submitted today
-        today_messages = [msg for msg in messages if msg.date_submitted.date() == today]
-
-        return render_template('view_messages.html', messages=messages, today_messages=today_messages)
-    
-    return render_template('404.html')
+    state = request.args.get('state', 'all')
+    if state not in INBOX_FILTERS:
+        state = 'all'
+    page = inbox_page(request.args.get('cursor'), state)
+    return render_template('view_messages.html', messages=page.items, page=page, state=state,
+                           counts=inbox_counts(), daily=daily_counts())
+
+@admin.route('/mark-message/<int:message_id>', methods=['POST'])
+@admin_required
+def mark_message(message_id):
+    read = request.form.get('read', '1') == '1'
+    mark_messages([message_id], read=read)
+    return redirect(request.referrer or url_for('admin.view_messages'))
+
+@admin.route('/mark-all-messages-read', methods=['POST'])
+@admin_required
+def mark_all_messages_read():
+    updated = mark_messages(read=True)
+    flash(f"{updated} message(s) marked as read.", "success")
+    return redirect(url_for('admin.view_messages'))
 
 @admin.route('/delete-message/<int:message_id>', methods=['POST'])
-@login_required
+@admin_required
 def delete_message(message_id):
-    if current_user.id != 3:
-        return render_template('404.html')  # Only admin can delete
-
     message = ContactMessage.query.get_or_404(message_id)
     db.session.delete(message)
     db.session.commit()
@@ -252,11 +293,50 @@ def delete_message(message_id):
 
         
 @admin.route('/admin-page')
-@login_required
+@admin_required
 def admin_page():
-    if current_user.id == 3:
-        return render_template('admin.html')
-    return render_template('404.html')
+    return render_template('admin.html')
+
+
+@admin.route('/admin/metrics')
+@admin_required
+def request_metrics():
+    if request.args.get('reset'):
+        request_stats().reset()
+    return jsonify(request_stats().snapshot())
+
+
+@admin.route('/sales-dashboard')
+@admin_required
+def sales_dashboard():
+    days = request.args.get('days', 30, type=int)
+    return render_template('sales_dashboard.html', summary=sales_summary(days),
+                           top_by_revenue=top_products('revenue'), top_by_units=top_products('units'),
+                           categories=category_breakdown())
+
+
+@admin.route('/api/sales/summary')
+@admin_required
+def sales_summary_api():
+    return jsonify(sales_summary(request.args.get('days', 30, type=int)))
+
+
+@admin.route('/api/sales/top-products')
+@admin_required
+def top_products_api():
+    return jsonify(top_products(request.args.get('by', 'revenue'), request.args.get('limit', 10, type=int)))
+
+
+@admin.route('/api/sales/categories')
+@admin_required
+def categories_sales_api():
+    return jsonify(category_breakdown())
+
+
+@admin.route('/cache-stats')
+@admin_required
+def cache_stats():
+    return jsonify(catalog_cache().stats())
 
 
 
@@ -271,17 +351,6 @@ def admin_page():
 
 
 
-@admin.route('/wishlist')
-@login_required
-def wishlist():
-    try:
-        # Fetch wishlist items for the current user
-        wishlist_items = Wishlist.query.filter_by(customer_id=current_user.id).all()
-        return render_template('wishlist.html', wishlist_items=wishlist_items)
-    except Exception as e:
-        # Log the error
-        print(f"Error fetching wishlist: {e}")
-        return "An error occurred while fetching the wishlist.", 500
 
 
 
@@ -1,15 +1,22 @@
+import logging
+
 from flask import Blueprint, render_template, flash, redirect, request, url_for, abort
 from .forms import LoginForm, SignUpForm, PasswordChangeForm, ReviewForm
-from .models import Customer, ContactMessage, Order, Wishlist, Product, Category, Review
+from .models import Customer, ContactMessage, Order, Product, Category, Review
 from . import db
-from flask_login import login_user, login_required, logout_user, current_user
-from sqlalchemy.exc import SQLAlchemyError
+from .pagination import product_page
+from .principal import admin_required, current_customer, forget_principal
+from .ratelimit import rate_limited
+from .reports import record_customer_deleted, record_order_deleted
+from flask_login import login_user, login_required, logout_user
 
 
 auth = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 
 
 @auth.route('/sign-up', methods=['GET', 'POST'])
+@rate_limited('sign_up')
 def sign_up():
     form = SignUpForm()
     if form.validate_on_submit():
@@ -30,7 +37,7 @@ def sign_up():
                 flash('Account Created Successfully, You can now Login')
                 return redirect('/login')
             except Exception as e:
-                print(e)
+                logger.warning('Sign up failed for %s: %s', email, e)
                 flash('Account Not Created!!, Email already exists')
 
             form.email.data = ''
@@ -41,6 +48,7 @@ def sign_up():
     return render_template('signup.html', form=form)
 
 @auth.route('/login', methods=['GET', 'POST'])
+@rate_limited('login')
 def login():
     form = LoginForm()
     if form.validate_on_submit():
@@ -57,6 +65,9 @@ def login():
             flash('Incorrect Email or Password.', 'danger')
             return render_template('login.html', form=form)
 
+        if db.session.is_modified(customer):
+            db.session.commit()  # verify_password upgraded an outdated hash
+
         # Successful login
         login_user(customer)
         flash('Logged in successfully!', 'success')
@@ -73,11 +84,18 @@ def log_out():
     return redirect('/')
 
 
+def _own_account(customer_id):
+    """The logged-in customer's full row; other customers' pages are a 404."""
+    if customer_id != current_customer().id:
+        abort(404)
+    return current_customer()
+
+
 @auth.route('/profile/<int:customer_id>')
 @login_required
 def profile(customer_id):
-    customer = Customer.query.get(customer_id)
-    print('Customer ID:', customer_id)
+    customer = _own_account(customer_id)
+    logger.debug('Profile viewed', extra={'customer_id': customer_id})
     return render_template('profile.html', customer=customer)
 
 
@@ -85,7 +103,7 @@ def profile(customer_id):
 @login_required
 def change_password(customer_id):
     form = PasswordChangeForm()
-    customer = Customer.query.get(customer_id)
+    customer = _own_account(customer_id)
     if form.validate_on_submit():
         current_password = form.current_password.data
         new_password = form.new_password.data
@@ -95,6 +113,7 @@ def change_password(customer_id):
             if new_password == confirm_new_password:
                 customer.password = confirm_new_password
                 db.session.commit()
+                forget_principal(customer.id)
                 flash('Password Updated Successfully')
                 return redirect(f'/profile/{customer.id}')
             else:
@@ -130,15 +149,13 @@ def contact():
 
 
 
-from sqlalchemy.orm import joinedload
-
 
 @auth.route('/products')
 @login_required
 def products():
     # This example assumes you have a Product model and template.
-    products = Product.query.all()
-    return render_template('products.html', products=products)
+    page = product_page(Product.query)
+    return render_template('products.html', products=page.items, page=page)
 
 
 
@@ -146,105 +163,43 @@ def products():
 def about_us():
     return render_template('about_us.html')
 
-@auth.route('/wishlist')
-@login_required
-def wishlist():
-    wishlist_items = Wishlist.query.filter_by(customer_id=current_user.id).options(
-        joinedload(Wishlist.product)
-    ).all()
-    return render_template('wishlist.html', wishlist_items=wishlist_items)
-
-
-@auth.route('/add-to-wishlist/<int:item_id>', methods=['POST'])
-@login_required
-def add_to_wishlist(item_id):
-    item = Product.query.get(item_id)  # Fetch the product by ID
-    if not item:
-        flash("Product not found.", "danger")
-        return redirect(url_for('products'))  # Redirect to products page or an appropriate page
-    
-    # Check if the item is already in the wishlist
-    existing_item = Wishlist.query.filter_by(customer_id=current_user.id, product_id=item.id).first()
-    if existing_item:
-        flash(f"'{item.product_name}' is already in your wishlist.", "info")
-    else:
-        # Add the item to the wishlist
-        wishlist_item = Wishlist(customer_id=current_user.id, product_id=item.id, quantity=1)
-        db.session.add(wishlist_item)
-        db.session.commit()
-        flash(f"'{item.product_name}' added to your wishlist!", "success")
-    
-    return redirect(url_for('auth.wishlist'))  # Change 'auth.view_wishlist' to your wishlist view function name
-
-
-
-
-
-
-
-@auth.route('/remove-from-wishlist/<int:item_id>', methods=['POST'])
-@login_required
-def remove_from_wishlist(item_id):
-    try:
-        # Fetch the wishlist item by its ID
-        wishlist_item = Wishlist.query.get_or_404(item_id)
-        
-        # Ensure the item belongs to the current user
-        if wishlist_item.customer_id != current_user.id:
-            flash("You are not authorized to remove this item.", "danger")
-            return redirect(url_for('auth.wishlist'))  # Redirect to wishlist page
-        
-        # Delete the item from the wishlist
-        db.session.delete(wishlist_item)
-        db.session.commit()
-        
-        # Flash success message
-        flash('Item successfully removed from your wishlist.', 'success')
-        
-    except SQLAlchemyError as e:
-        db.session.rollback()  # Rollback in case of error
-        flash(f"An error occurred while removing the item: {str(e)}", "danger")
-    
-    # Redirect back to the wishlist page
-    return redirect(url_for('auth.wishlist'))
-
-
-
 @auth.route('/category/<int:category_id>', methods=['GET'])
 def filter_products_by_category(category_id):
     # Fetch the category by its ID
     category = Category.query.get_or_404(category_id)
 
     # Get all products belonging to this category
-    products = Product.query.filter_by(category_id=category.id).all()
+    page = product_page(Product.query.filter_by(category_id=category.id))
 
     # Render the template with the filtered products
-    return render_template('filtered_products.html', category=category, products=products)
+    return render_template('filtered_products.html', category=category, products=page.items, page=page)
 
 
 
-@auth.route('/delete-order/<int:order_id>')
+@auth.route('/delete-order/<int:order_id>', methods=['POST'])
+@admin_required
 def delete_order(order_id):
-    order = Order.query.get(order_id)
-    if order:
-        db.session.delete(order)
-        db.session.commit()
-        flash('Order deleted successfully.', 'success')
-    else:
-        flash('Order not found.', 'danger')
+    order = Order.query.get_or_404(order_id)
+    record_order_deleted(order)
+    db.session.delete(order)
+    db.session.commit()
+    flash('Order deleted successfully.', 'success')
     return redirect('/view-orders')
 
 
 @auth.route('/delete-customer/<int:customer_id>', methods=['POST'])
+@admin_required
 def delete_customer(customer_id):
     customer = Customer.query.get_or_404(customer_id)
 
-    if customer.id == 3:
+    if customer.is_admin:
         flash("Admin account cannot be deleted.", "warning")
         return redirect(url_for('admin.display_customers'))
 
+    record_customer_deleted(customer_id)  # their orders go with the account
     db.session.delete(customer)
     db.session.commit()
+    forget_principal(customer_id)
     flash("Customer deleted successfully!", "success")
     return redirect(url_for('admin.display_customers'))  
 
@@ -0,0 +1,39 @@
+from flask import g
+from sqlalchemy import func, select
+from .models import Cart, Wishlist
+from . import db
+
+
+# Navbar badge counts (cart quantity + wishlist size) are rendered on every page,
+# so both numbers come from one aggregate query and are kept on `g` for the rest
+# of the request.
+_BADGE_KEY = '_badge_counts'
+
+
+def _query_badge_counts(customer_id):
+    cart_total = (
+        select(func.coalesce(func.sum(Cart.quantity), 0))
+        .where(Cart.customer_link == customer_id)
+        .scalar_subquery()
+    )
+    wishlist_total = (
+        select(func.count(Wishlist.id))
+        .where(Wishlist.customer_id == customer_id)
+        .scalar_subquery()
+    )
+    cart_count, wishlist_count = db.session.execute(select(cart_total, wishlist_total)).one()
+    return int(cart_count), int(wishlist_count)
+
+
+def get_badge_counts(customer_id):
+    """Return (cart_count, wishlist_count), memoized for the current request."""
+    cached = g.get(_BADGE_KEY)
+    if cached is None or cached[0] != customer_id:
+        cached = (customer_id, _query_badge_counts(customer_id))
+        setattr(g, _BADGE_KEY, cached)
+    return cached[1]
+
+
+def invalidate_badge_counts():
+    """Drop the memoized counts after a cart or wishlist mutation."""
+    g.pop(_BADGE_KEY, None)
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from .models import Category, Product
+from .pagination import product_page
+
+
+class CacheBackend:
+    """Storage interface for the catalog cache.
+
+    MemoryCache below is per-process; a shared store (Redis, memcached) only
+    has to implement these four methods to be dropped in via
+    init_catalog_cache(app, backend=...).
+    """
+
+    def get(self, key):
+        """Return the stored value, or None on a miss."""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Thread-safe LRU dict whose entries also expire after their TTL."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CatalogCache:
+    """Read-through cache with hit/miss counters in front of a CacheBackend.
+
+    Values must be plain data (dicts, lists), never ORM instances, because
+    they outlive the session that loaded them.
+    """
+
+    def __init__(self, backend, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()  # += is not atomic across request threads
+
+    def get_or_load(self, key, loader, ttl=None):
+        value = self.backend.get(key)
+        with self._stats_lock:
+            if value is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if value is not None:
+            return value
+        value = loader()
+        if value is not None:
+            self.backend.set(key, value, ttl or self.ttl)
+        return value
+
+    def generation(self, namespace):
+        """Counter baked into keys of a namespace; bumping it drops them all."""
+        return self.backend.get(f'{namespace}:generation') or 0
+
+    def bump(self, namespace):
+        # Generations must outlive the entries that use them
+        self.backend.set(f'{namespace}:generation', self.generation(namespace) + 1, 86400 * 365)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else 0.0,
+        }
+
+
+def init_catalog_cache(app, backend=None):
+    app.extensions['catalog_cache'] = CatalogCache(
+        backend or MemoryCache(app.config.get('CATALOG_CACHE_SIZE', 1024)),
+        ttl=app.config.get('CATALOG_CACHE_TTL', 60),
+    )
+
+
+def catalog_cache():
+    return current_app.extensions['catalog_cache']
+
+
+def product_record(product):
+    return {column.key: getattr(product, column.key) for column in Product.__table__.columns}
+
+
+def get_categories():
+    """All categories as [{'id', 'name'}]."""
+    def load():
+        return [{'id': c.id, 'name': c.name} for c in Category.query.order_by(Category.id).all()]
+    return catalog_cache().get_or_load('categories', load)
+
+
+def get_product(product_id):
+    """One product as a plain dict, or None if it doesn't exist."""
+    def load():
+        product = Product.query.get(product_id)
+        return product_record(product) if product else None
+    return catalog_cache().get_or_load(f'product:{product_id}', load)
+
+
+def get_flash_sale_page(cursor=None):
+    """A keyset page of flash-sale products (see pagination.product_page)."""
+    cache = catalog_cache()
+
+    def load():
+        page = product_page(Product.query.filter_by(flash_sale=True))
+        page.items = [product_record(item) for item in page.items]
+        return page
+    return cache.get_or_load(f'flash_sale:{cache.generation("products")}:{cursor or ""}', load)
+
+
+def invalidate_product(product_id=None):
+    """Forget a product and every cached listing it may appear in."""
+    cache = catalog_cache()
+    if product_id is not None:
+        cache.delete(f'product:{product_id}')
+    cache.bump('products')
+
+
+def invalidate_categories():
+    """Forget the category list; call after creating or renaming categories."""
+    catalog_cache().delete('categories')
@@ -0,0 +1,166 @@
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import joinedload
+from .models import Cart, Product
+from . import db, upsert_insert
+
+
+SHIPPING_FEE = 200
+MAX_BATCH_CHANGES = 100
+
+
+def cart_items(customer_id):
+    """Cart rows for a customer with their products loaded in the same query."""
+    return (
+        Cart.query.filter_by(customer_link=customer_id)
+        .options(joinedload(Cart.product))
+        .order_by(Cart.id)
+        .all()
+    )
+
+
+def cart_totals(customer_id):
+    """Quantity, subtotal and total (with shipping) from one joined aggregate."""
+    quantity, amount = db.session.execute(
+        select(
+            func.coalesce(func.sum(Cart.quantity), 0),
+            func.coalesce(func.sum(Cart.quantity * Product.current_price), 0),
+        )
+        .join(Product, Product.id == Cart.product_link)
+        .where(Cart.customer_link == customer_id)
+    ).one()
+    return {
+        'quantity': int(quantity),
+        'amount': amount,
+        'total': amount + SHIPPING_FEE,
+    }
+
+
+class CartItemNotFound(LookupError):
+    pass
+
+
+def _summary(customer_id, cart_id, quantity):
+    return {'cart_id': cart_id, 'item_quantity': quantity, **cart_totals(customer_id)}
+
+
+def add_item(customer_id, product_id):
+    """Put one more of a product in the cart with a single upsert.
+
+    The unique (customer_link, product_link) index turns a second add into
+    quantity = quantity + 1 on the existing row, so double clicks can't
+    create duplicates or lose an increment. Returns the line and cart summary.
+    """
+    table = Cart.__table__
+    try:
+        upsert = upsert_insert(table)
+        if upsert is not None:
+            upsert = upsert.values(customer_link=customer_id, product_link=product_id, quantity=1)
+            cart_id, quantity = db.session.execute(
+                upsert.on_conflict_do_update(
+                    index_elements=['customer_link', 'product_link'],
+                    set_={'quantity': table.c.quantity + 1},
+                ).returning(table.c.id, table.c.quantity)
+            ).one()
+        else:
+            row = db.session.execute(
+                update(table)
+                .where(table.c.customer_link == customer_id, table.c.product_link == product_id)
+                .values(quantity=table.c.quantity + 1)
+                .returning(table.c.id, table.c.quantity)
+            ).first()
+            if row is None:
+                row = db.session.execute(
+                    insert(table).values(customer_link=customer_id, product_link=product_id, quantity=1)
+                    .returning(table.c.id, table.c.quantity)
+                ).one()
+            cart_id, quantity = row
+        summary = _summary(customer_id, cart_id, quantity)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def change_quantity(customer_id, cart_id, delta):
+    """Add `delta` to a cart line in one UPDATE; the line is deleted once it reaches zero.
+
+    Only the customer's own lines match, so a guessed cart_id raises
+    CartItemNotFound instead of touching someone else's cart.
+    """
+    try:
+        quantity = db.session.execute(
+            update(Cart)
+            .where(Cart.id == cart_id, Cart.customer_link == customer_id)
+            .values(quantity=Cart.quantity + delta)
+            .returning(Cart.quantity)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if quantity is None:
+            raise CartItemNotFound(cart_id)
+        if quantity <= 0:
+            _delete_line(customer_id, cart_id)
+            quantity = 0
+        summary = _summary(customer_id, cart_id, quantity)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def remove_item(customer_id, cart_id):
+    try:
+        if not _delete_line(customer_id, cart_id):
+            raise CartItemNotFound(cart_id)
+        summary = _summary(customer_id, cart_id, 0)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def set_quantities(customer_id, changes):
+    """Apply {cart_id: quantity} in one transaction; a quantity of 0 removes the line.
+
+    Every id must be one of the customer's lines, otherwise nothing is
+    changed and CartItemNotFound lists the unknown ids. Updates and deletes
+    each go out as a single executemany.
+    """
+    table = Cart.__table__
+    try:
+        owned = set(db.session.execute(
+            select(table.c.id).where(table.c.customer_link == customer_id, table.c.id.in_(list(changes)))
+        ).scalars())
+        missing = sorted(set(changes) - owned)
+        if missing:
+            raise CartItemNotFound(missing)
+
+        updates = [{'line_id': cart_id, 'new_quantity': quantity}
+                   for cart_id, quantity in changes.items() if quantity > 0]
+        removals = [{'line_id': cart_id} for cart_id, quantity in changes.items() if quantity <= 0]
+        if updates:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('line_id')).values(quantity=bindparam('new_quantity')),
+                updates,
+            )
+        if removals:
+            db.session.execute(delete(table).where(table.c.id == bindparam('line_id')), removals)
+
+        summary = cart_totals(customer_id)
+        summary['items'] = [{'cart_id': cart_id, 'quantity': max(quantity, 0)}
+                            for cart_id, quantity in changes.items()]
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return summary
+
+
+def _delete_line(customer_id, cart_id):
+    return db.session.execute(
+        delete(Cart)
+        .where(Cart.id == cart_id, Cart.customer_link == customer_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
@@ -0,0 +1,266 @@
+import csv
+import json
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import insert, select, text
+from .cache import invalidate_categories
+from .models import Category, Product
+from . import db, upsert_insert
+
+
+FIELDS = ('id', 'product_name', 'current_price', 'previous_price', 'in_stock',
+          'product_picture', 'flash_sale', 'date_added', 'category')
+DEFAULT_BATCH_SIZE = 5000
+PROGRESS_EVERY = 100000
+
+catalog_cli = AppGroup('catalog', help='Bulk product import and export.')
+
+
+class RowError(ValueError):
+    pass
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def _open(path, mode):
+    if path == '-':
+        # Leave stdin/stdout open when the with block ends
+        return nullcontext(sys.stdin if 'r' in mode else sys.stdout)
+    return open(path, mode, newline='', encoding='utf-8')
+
+
+def read_rows(stream, fmt):
+    """Yield one raw record per product from a CSV or JSONL stream.
+
+    JSONL lines are yielded undecoded so a malformed line is reported and
+    skipped along with the other bad records (see decode_record()).
+    """
+    if fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield line
+    else:
+        yield from csv.DictReader(stream)
+
+
+def decode_record(raw):
+    """The record as a dict, decoding JSONL text; raises RowError for anything else."""
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError as e:
+            raise RowError(f'invalid JSON: {e}') from e
+    if not isinstance(raw, dict):
+        raise RowError(f'expected an object, got {type(raw).__name__}')
+    return raw
+
+
+def _blank(value):
+    return value is None or value == ''
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def parse_row(raw, categories):
+    """Turn one input record into Product column values.
+
+    `categories` maps category name -> id and is looked up, never queried.
+    """
+    try:
+        name = (raw.get('product_name') or '').strip()
+        if not name:
+            raise RowError('product_name is required')
+        category = raw.get('category')
+        if _blank(category):
+            raise RowError('category is required')
+        category_id = categories.get(str(category).strip())
+        if category_id is None:
+            raise RowError(f'unknown category {category!r}')
+        date_added = raw.get('date_added')
+        return {
+            'id': None if _blank(raw.get('id')) else int(raw['id']),
+            'product_name': name[:100],
+            'current_price': float(raw['current_price']),
+            'previous_price': None if _blank(raw.get('previous_price')) else float(raw['previous_price']),
+            'in_stock': 0 if _blank(raw.get('in_stock')) else int(raw['in_stock']),
+            'product_picture': raw.get('product_picture') or None,
+            'flash_sale': _bool(raw.get('flash_sale') or False),
+            'date_added': datetime.utcnow() if _blank(date_added) else datetime.fromisoformat(str(date_added)),
+            'category_id': category_id,
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        raise RowError(str(e)) from e
+
+
+def load_category_map(create_from=()):
+    """{name: id} for every category, creating any missing names in create_from."""
+    categories = dict(db.session.execute(select(Category.name, Category.id)).all())
+    missing = sorted(set(create_from) - set(categories))
+    if missing:
+        db.session.execute(insert(Category), [{'name': name} for name in missing])
+        db.session.commit()
+        invalidate_categories()
+        categories = dict(db.session.execute(select(Category.name, Category.id)).all())
+    return categories
+
+
+def _upsert_statement():
+    """INSERT for rows carrying an id that updates the existing product instead of failing."""
+    table = Product.__table__
+    stmt = upsert_insert(table)
+    if stmt is None:
+        return None
+    return stmt.on_conflict_do_update(
+        index_elements=['id'],
+        set_={name: stmt.excluded[name] for name in FIELDS[1:-1] + ('category_id',)},
+    )
+
+
+def _flush(new_rows, keyed_rows, upsert):
+    """Write one batch with executemany and commit it as its own transaction."""
+    if new_rows:
+        db.session.execute(insert(Product.__table__), [
+            {key: value for key, value in row.items() if key != 'id'} for row in new_rows
+        ])
+    if keyed_rows:
+        if upsert is not None:
+            db.session.execute(upsert, keyed_rows)
+        else:
+            for row in keyed_rows:
+                db.session.merge(Product(**row))
+    db.session.commit()
+
+
+def import_products(rows, batch_size=DEFAULT_BATCH_SIZE, create_categories=True, on_error=None):
+    """Bulk-load an iterable of raw product records; returns (imported, skipped).
+
+    Rows are parsed lazily and written in batches of `batch_size`, so memory
+    stays flat however big the input is. Records with an id are upserted,
+    the rest are inserted.
+    """
+    categories = load_category_map()
+    upsert = _upsert_statement()
+    imported = skipped = 0
+    new_rows, keyed_rows = [], []
+    for line_number, raw in enumerate(rows, start=1):
+        try:
+            record = decode_record(raw)
+            try:
+                values = parse_row(record, categories)
+            except RowError:
+                category = str(record.get('category') or '').strip()
+                if not (create_categories and category and category not in categories):
+                    raise
+                categories = load_category_map([category])
+                values = parse_row(record, categories)
+        except RowError as e:
+            skipped += 1
+            if on_error:
+                on_error(line_number, e)
+            continue
+        (new_rows if values['id'] is None else keyed_rows).append(values)
+        if len(new_rows) + len(keyed_rows) >= batch_size:
+            _flush(new_rows, keyed_rows, upsert)
+            imported += len(new_rows) + len(keyed_rows)
+            new_rows, keyed_rows = [], []
+            if imported % PROGRESS_EVERY < batch_size:
+                click.echo(f'  {imported} rows...', err=True)
+    if new_rows or keyed_rows:
+        _flush(new_rows, keyed_rows, upsert)
+        imported += len(new_rows) + len(keyed_rows)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Explicit ids don't advance the serial; move it past them
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('product', 'id'), "
+                                "COALESCE((SELECT MAX(id) FROM product), 1))"))
+        db.session.commit()
+    return imported, skipped
+
+
+def export_rows(batch_size=DEFAULT_BATCH_SIZE):
+    """Yield every product as a dict, streamed from the database in chunks."""
+    result = db.session.execute(
+        select(Product.id, Product.product_name, Product.current_price, Product.previous_price,
+               Product.in_stock, Product.product_picture, Product.flash_sale, Product.date_added,
+               Category.name.label('category'))
+        .outerjoin(Category, Category.id == Product.category_id)
+        .order_by(Product.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in result:
+        record = row._asdict()
+        if record['date_added'] is not None:
+            record['date_added'] = record['date_added'].isoformat()
+        yield record
+
+
+def write_rows(stream, rows, fmt):
+    count = 0
+    if fmt == 'jsonl':
+        for row in rows:
+            stream.write(json.dumps(row) + '\n')
+            count += 1
+    else:
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _report(action, count, started):
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed else float('inf')
+    click.echo(f'{action} {count} products in {elapsed:.2f}s ({rate:,.0f} rows/sec).', err=True)
+
+
+@catalog_cli.command('import')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Rows per transaction.')
+@click.option('--create-categories/--no-create-categories', default=True, show_default=True,
+              help='Create categories that do not exist yet instead of skipping their rows.')
+def import_command(path, fmt, batch_size, create_categories):
+    """Load products from a CSV or JSONL file ('-' for stdin)."""
+    fmt = _format_for(path, fmt)
+
+    def on_error(line_number, error):
+        click.echo(f'  record {line_number} skipped: {error}', err=True)
+
+    started = time.perf_counter()
+    with _open(path, 'r') as stream:
+        imported, skipped = import_products(read_rows(stream, fmt), batch_size=batch_size,
+                                            create_categories=create_categories, on_error=on_error)
+    _report('Imported', imported, started)
+    if skipped:
+        click.echo(f'{skipped} records skipped.', err=True)
+    # This process's cache is not the web servers'; theirs expires on its own
+    click.echo(f'Running web servers show the changes within {current_app.config.get("CATALOG_CACHE_TTL", 60)}s '
+               'as their catalog cache expires.', err=True)
+
+
+@catalog_cli.command('export')
+@click.argument('path')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Rows fetched per round trip.')
+def export_command(path, fmt, batch_size):
+    """Write every product to a CSV or JSONL file ('-' for stdout)."""
+    fmt = _format_for(path, fmt)
+    started = time.perf_counter()
+    with _open(path, 'w') as stream:
+        count = write_rows(stream, export_rows(batch_size), fmt)
+    _report('Exported', count, started)
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, update
+from .models import Cart, Category, Order, Product
+from .reports import record_sales, sale_line
+from . import db
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, product_id):
+        super().__init__(f'Product {product_id} does not have enough stock')
+        self.product_id = product_id
+
+
+def checkout_cart(customer_id, payment_id, status='Paid'):
+    """Turn the customer's cart into orders in a single transaction.
+
+    The cart is claimed with one DELETE ... RETURNING, so clicks that land
+    while we are checking out cannot change the snapshot. Stock is reserved
+    with conditional UPDATEs (in_stock >= quantity); if any product is short
+    the whole transaction is rolled back and the cart is left untouched.
+    Returns the number of orders created.
+    """
+    try:
+        claimed = db.session.execute(
+            delete(Cart)
+            .where(Cart.customer_link == customer_id)
+            .returning(Cart.product_link, Cart.quantity)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not claimed:
+            raise CheckoutError('Cart is empty')
+
+        product_ids = {row.product_link for row in claimed}
+        products = {row.id: row for row in db.session.execute(
+            select(Product.id, Product.current_price, Product.product_name, Product.category_id,
+                   Category.name.label('category_name'))
+            .outerjoin(Category, Category.id == Product.category_id)
+            .where(Product.id.in_(product_ids))
+        )}
+
+        # Lock products in a fixed order so concurrent checkouts can't deadlock
+        # on server databases.
+        claimed.sort(key=lambda row: row.product_link)
+        for row in claimed:
+            reserved = db.session.execute(
+                update(Product)
+                .where(Product.id == row.product_link, Product.in_stock >= row.quantity)
+                .values(in_stock=Product.in_stock - row.quantity)
+                .execution_options(synchronize_session=False)
+            )
+            if reserved.rowcount != 1:
+                raise OutOfStock(row.product_link)
+
+        now = datetime.utcnow()
+        orders, sales = [], []
+        for row in claimed:
+            product = products[row.product_link]
+            orders.append({
+                'quantity': row.quantity,
+                'price': product.current_price,
+                'status': status,
+                'payment_id': payment_id,
+                'product_link': row.product_link,
+                'sold_product_id': row.product_link,
+                'sold_category_id': product.category_id,
+                'customer_link': customer_id,
+                'date_created': now,
+            })
+            sales.append(sale_line(row.quantity, product.current_price, day=now.date(),
+                                   product_id=product.id, product_name=product.product_name,
+                                   category_id=product.category_id, category_name=product.category_name))
+        db.session.execute(insert(Order), orders)
+        record_sales(sales)  # same transaction: rollups never drift from the orders
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(claimed)
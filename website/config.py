@@ -0,0 +1,183 @@
+import os
+
+from sqlalchemy import event
+
+
+DB_NAME = 'database.sqlite3'
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_levels(name):
+    """'website.admin=DEBUG,website.payments=WARNING' -> {'website.admin': 'DEBUG', ...}"""
+    levels = {}
+    for item in os.environ.get(name, '').split(','):
+        if '=' in item:
+            logger, level = item.split('=', 1)
+            levels[logger.strip()] = level.strip().upper()
+    return levels
+
+
+class Config:
+    """Settings shared by every profile. Values can be overridden from the environment."""
+
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'willofD')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', f'sqlite:///{DB_NAME}')
+
+    KHALTI_SECRET_KEY = os.environ.get('KHALTI_SECRET_KEY', "test_secret_key_xxxxxxxxxxxxxxxxxxxxxxxx")  # Replace with your actual test/live secret key
+    KHALTI_ASYNC_VERIFY = False  # True: verify in a background pool and let the page poll (job state is kept in the database)
+
+    # Applied to every new SQLite connection (ignored for other databases).
+    # WAL lets readers run alongside the single writer, NORMAL sync is safe
+    # under WAL, and busy_timeout makes writers queue instead of failing with
+    # "database is locked".
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', 128 * 1024 * 1024),
+        'cache_size': _env_int('SQLITE_CACHE_SIZE', -32000),  # negative = KiB, so ~32 MB
+        'temp_store': 'MEMORY',
+    }
+
+    # Uploaded product images and their generated variants (see images.py)
+    MEDIA_FOLDER = os.environ.get('MEDIA_FOLDER', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'media'))
+    IMAGE_WORKERS = _env_int('IMAGE_WORKERS', 2)
+    IMAGE_PROCESS_INLINE = False  # True: build variants inside the request (scripts, tests)
+    # Hand media file bodies to the front proxy: None, 'x-sendfile' (Apache,
+    # lighttpd) or 'x-accel' (nginx, with an internal location at MEDIA_ACCEL_PREFIX)
+    MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD') or None
+    MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/_media/')
+    USE_X_SENDFILE = MEDIA_OFFLOAD == 'x-sendfile'
+
+    # Per-request SQL instrumentation (see instrumentation.py)
+    SERVER_TIMING = False  # add a Server-Timing header with query count and DB time
+    SLOW_QUERY_MS = _env_int('SLOW_QUERY_MS', 100)
+    # When set, /metrics scrapes must send `Authorization: Bearer <token>`;
+    # otherwise only a logged-in admin can read it
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+    # Logging (see logs.py). LOG_LEVELS sets per-module levels, e.g. from
+    # LOG_LEVELS="website.admin=DEBUG,website.payments=WARNING"; LOG_SAMPLE_RATES
+    # keeps only that share of a module's DEBUG records.
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # 'json' or 'text'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = _env_levels('LOG_LEVELS')
+    LOG_SAMPLE_RATES = {'website.admin': 0.1}
+
+    # Password hashing (see passwords.py): any Werkzeug method string, e.g.
+    # 'scrypt:32768:8:1' or 'pbkdf2:sha256:1000000'. Hashes made with other
+    # settings are replaced on the owner's next login. Hashing runs on
+    # PASSWORD_HASH_WORKERS threads; past PASSWORD_HASH_MAX_PENDING queued
+    # hashes, logins get a 503 instead of waiting. Hashing releases the GIL,
+    # so the pool is kept to half the cores to leave the rest for serving
+    # pages. Each worker process gets its own pool: with N processes, divide
+    # this by N.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = _env_int('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+    PASSWORD_HASH_MAX_PENDING = _env_int('PASSWORD_HASH_MAX_PENDING', 64)
+
+    # Number of reverse proxies (e.g. nginx) in front of the app. Their
+    # X-Forwarded-For/-Proto headers are trusted, so request.remote_addr is the
+    # real client rather than the proxy. Off in every profile: set the
+    # TRUSTED_PROXIES environment variable only when the app really sits behind
+    # that many proxies, or anyone could spoof their address.
+    TRUSTED_PROXIES = _env_int('TRUSTED_PROXIES', 0)
+
+    # Login and sign-up throttling (see ratelimit.py): token buckets of
+    # (requests, seconds) per client IP and per submitted email. Buckets live
+    # in process memory, at most RATE_LIMIT_MAX_KEYS of them. Behind a proxy,
+    # set TRUSTED_PROXIES or every client shares the proxy's IP bucket.
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMITS = {
+        'login': {'ip': (20, 60), 'email': (5, 60)},
+        'sign_up': {'ip': (5, 600), 'email': (3, 600)},
+    }
+    RATE_LIMIT_MAX_KEYS = _env_int('RATE_LIMIT_MAX_KEYS', 100000)
+
+    # Logged-in users are cached as SessionPrincipals for this many seconds
+    # (admins for less, so a revoked admin loses access quickly). The default
+    # cache is per process: forget_principal() only reaches the process that
+    # calls it, and other workers see role changes and deleted accounts once
+    # their entry expires. Set PRINCIPAL_CACHE_BACKEND to a shared CacheBackend
+    # (see cache.py) to make invalidation immediate everywhere.
+    PRINCIPAL_CACHE_TTL = _env_int('PRINCIPAL_CACHE_TTL', 60)
+    PRINCIPAL_ADMIN_CACHE_TTL = _env_int('PRINCIPAL_ADMIN_CACHE_TTL', 5)
+    PRINCIPAL_CACHE_BACKEND = None
+
+    # Pool settings for server databases (PostgreSQL, MySQL)
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 20)
+    DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 30)
+    DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)
+
+
+class DevelopmentConfig(Config):
+    SERVER_TIMING = True
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG')
+
+
+class ProductionConfig(Config):
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 20)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 40)
+
+
+class TestingConfig(Config):
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # fast hashes; never use outside tests
+    RATE_LIMIT_ENABLED = False
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite://')
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+
+def get_config(name=None):
+    """Config class for `name`, or for $SAJILO_CONFIG.
+
+    Defaults to production, so a deployment that forgets the variable doesn't
+    run with development logging and headers; `python app.py` picks
+    development itself.
+    """
+    name = name or os.environ.get('SAJILO_CONFIG', 'production')
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f'Unknown config profile {name!r}; expected one of {", ".join(PROFILES)}')
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database."""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        # busy_timeout is also set as a pragma; this covers the connect itself
+        return {'connect_args': {'timeout': config['SQLITE_PRAGMAS'].get('busy_timeout', 5000) / 1000}}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+    }
+
+
+def configure_sqlite(engine, pragmas):
+    """Run the PRAGMA statements on every connection the engine opens."""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -3,7 +3,7 @@ from wtforms import StringField, IntegerField, FloatField, PasswordField, EmailF
 from wtforms.validators import DataRequired, Email, Length
 from wtforms.validators import DataRequired, length, NumberRange
 from flask_wtf.file import FileField, FileRequired
-from .models import Category
+from .cache import get_categories
 
 
 class SignUpForm(FlaskForm):
@@ -44,7 +44,7 @@ class ShopItemsForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(ShopItemsForm, self).__init__(*args, **kwargs)
         # Dynamically populate the categories
-        self.category_id.choices = [(category.id, category.name) for category in Category.query.all()]
+        self.category_id.choices = [(category['id'], category['name']) for category in get_categories()]
 
 
 
@@ -0,0 +1,179 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from PIL import Image, ImageOps
+from sqlalchemy import func, select, update
+from werkzeug.utils import secure_filename
+
+from .cache import invalidate_product
+from .media import media_url
+from .models import Product
+from . import db
+
+
+# Longest edge in pixels for each generated variant, largest first so each
+# step can downscale the previous (already smaller) image.
+VARIANTS = (('large', 1200), ('medium', 600), ('thumb', 200))
+FORMATS = (('webp', 'WEBP', {'quality': 80, 'method': 4}),
+           ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}))
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+images_cli = AppGroup('images', help='Product image variants.')
+
+
+def media_folder():
+    return current_app.config['MEDIA_FOLDER']
+
+
+def media_path(name):
+    """Value stored on Product for a file in the media folder."""
+    return f'./media/{name}'
+
+
+def save_upload(file):
+    """Store an uploaded image under a content-hashed name and return its media path.
+
+    Identical uploads map to the same file, so re-uploading an image is free
+    and the name changes whenever the content does (safe to cache forever).
+    """
+    data = file.read()
+    digest = hashlib.sha256(data).hexdigest()[:20]
+    _, ext = os.path.splitext(secure_filename(file.filename or ''))
+    name = f'{digest}{ext.lower() or ".img"}'
+    path = os.path.join(media_folder(), name)
+    if not os.path.exists(path):
+        with open(path, 'wb') as out:
+            out.write(data)
+    return media_path(name)
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite transparent images onto white."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_variants(source_path, folder):
+    """Write every size/format variant of `source_path` into `folder`.
+
+    Returns {'thumb': {'webp': path, 'jpeg': path, 'width': w, 'height': h}, ...}.
+    """
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    variants = {}
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+    for size_name, edge in VARIANTS:
+        if max(image.size) > edge:
+            image.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=3.0)
+        entry = {'width': image.width, 'height': image.height}
+        for fmt, pil_format, options in FORMATS:
+            name = f'{stem}-{size_name}.{"jpg" if fmt == "jpeg" else fmt}'
+            target = os.path.join(folder, name)
+            if not os.path.exists(target):
+                buffer = io.BytesIO()
+                (_flatten(image) if fmt == 'jpeg' else image).save(buffer, pil_format, **options)
+                tmp = f'{target}.tmp'
+                with open(tmp, 'wb') as out:
+                    out.write(buffer.getvalue())
+                os.replace(tmp, target)
+            entry[fmt] = media_path(name)
+        variants[size_name] = entry
+    return variants
+
+
+def _process(app, product_id, picture):
+    with app.app_context():
+        try:
+            source = os.path.join(app.config['MEDIA_FOLDER'], os.path.basename(picture))
+            variants = generate_variants(source, app.config['MEDIA_FOLDER'])
+            # Only record the variants if the product still points at this upload
+            db.session.execute(
+                update(Product)
+                .where(Product.id == product_id, Product.product_picture == picture)
+                .values(image_variants=variants)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            invalidate_product(product_id)
+        except Exception:
+            db.session.rollback()
+            logger.exception('Image processing failed for product %s', product_id)
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=app.config.get('IMAGE_WORKERS', 2),
+                                           thread_name_prefix='image-variants')
+    return _executor
+
+
+def schedule_variants(product_id, picture):
+    """Generate the product's variants on the worker pool and return immediately."""
+    app = current_app._get_current_object()
+    if app.config.get('IMAGE_PROCESS_INLINE'):
+        _process(app, product_id, picture)
+        return None
+    return _get_executor(app).submit(_process, app, product_id, picture)
+
+
+@images_cli.command('rebuild')
+def rebuild_command():
+    """Build the variants of every product picture that has none yet.
+
+    Covers images uploaded before variants existed. Runs on the IMAGE_WORKERS
+    pool and waits for it; the web servers pick up the new variants as their
+    catalog cache entries expire.
+    """
+    pending = db.session.execute(
+        select(Product.id, Product.product_picture)
+        .where(Product.image_variants.is_(None), Product.product_picture.isnot(None), Product.product_picture != '')
+    ).all()
+    click.echo(f'Building variants for {len(pending)} products...', err=True)
+    futures = [schedule_variants(product_id, picture) for product_id, picture in pending]
+    wait([future for future in futures if future is not None])
+    missing = db.session.scalar(
+        select(func.count()).select_from(Product)
+        .where(Product.id.in_([product_id for product_id, _ in pending]), Product.image_variants.is_(None))
+    )
+    click.echo(f'{len(pending) - missing} products updated, {missing} failed (see the log).')
+
+
+def _field(item, name):
+    # Templates pass ORM rows or the plain dicts served from the catalog cache
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+def product_image(item, size='medium', fmt='webp'):
+    """URL for a product picture variant, falling back to the original upload."""
+    if item is None:
+        return ''  # orders whose product has since been deleted
+    variants = _field(item, 'image_variants') or {}
+    return media_url(variants.get(size, {}).get(fmt) or _field(item, 'product_picture'))
+
+
+def product_srcset(item, fmt='webp'):
+    """srcset value listing every generated width, or '' before processing finishes."""
+    if item is None:
+        return ''
+    widths = {}
+    for variant in (_field(item, 'image_variants') or {}).values():
+        widths.setdefault(variant['width'], variant[fmt])
+    return ', '.join(f'{media_url(url)} {width}w' for width, url in sorted(widths.items()))
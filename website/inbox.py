@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, func, select, update
+from .models import ContactMessage
+from .pagination import keyset_page
+from . import db
+
+
+INBOX_FILTERS = ('all', 'unread', 'read')
+
+
+def _start_of_today():
+    # date_submitted is stored in UTC (datetime.utcnow default)
+    return datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+
+def inbox_counts():
+    """Total, unread and today's message counts from a single aggregate query."""
+    row = db.session.execute(
+        select(
+            func.count(ContactMessage.id),
+            func.coalesce(func.sum(case((ContactMessage.is_read.is_(False), 1), else_=0)), 0),
+            func.coalesce(func.sum(case((ContactMessage.date_submitted >= _start_of_today(), 1), else_=0)), 0),
+        )
+    ).one()
+    return {'total': row[0], 'unread': row[1], 'today': row[2]}
+
+
+def daily_counts(days=14):
+    """Messages per day for the last `days` days, newest first (days with none are omitted)."""
+    since = _start_of_today() - timedelta(days=days - 1)
+    day = func.date(ContactMessage.date_submitted)
+    rows = db.session.execute(
+        select(day, func.count(ContactMessage.id))
+        .where(ContactMessage.date_submitted >= since)
+        .group_by(day)
+        .order_by(day.desc())
+    )
+    return [{'day': str(row_day), 'count': count} for row_day, count in rows]
+
+
+def inbox_page(cursor=None, state='all', per_page=None):
+    """Newest-first keyset page of messages, optionally only read or unread ones."""
+    query = ContactMessage.query
+    if state == 'unread':
+        query = query.filter(ContactMessage.is_read.is_(False))
+    elif state == 'read':
+        query = query.filter(ContactMessage.is_read.is_(True))
+    return keyset_page(query, ContactMessage.date_submitted, ContactMessage.id, cursor=cursor,
+                       per_page=per_page or current_app.config.get('MESSAGES_PER_PAGE', 50),
+                       descending=True)
+
+
+def mark_messages(message_ids=None, read=True):
+    """Set the read flag on the given messages (all of them when ids is None)."""
+    stmt = update(ContactMessage).values(is_read=read).execution_options(synchronize_session=False)
+    if message_ids is not None:
+        stmt = stmt.where(ContactMessage.id.in_(message_ids))
+    else:
+        stmt = stmt.where(ContactMessage.is_read != read)
+    result = db.session.execute(stmt)
+    db.session.commit()
+    return result.rowcount
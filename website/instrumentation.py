@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from .metrics import IN_FLIGHT, REQUEST_DB_TIME, REQUEST_LATENCY, REQUEST_QUERIES, REQUESTS
+
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_LOG_SIZE = 50
+REQUEST_METRICS = (REQUESTS, REQUEST_LATENCY, REQUEST_DB_TIME, REQUEST_QUERIES)
+
+
+def _buckets(histogram, slots, scale=1):
+    # A list, not a dict: jsonify sorts keys and would scramble the bucket order
+    bounds = tuple(bound * scale for bound in histogram.buckets) + ('+Inf',)
+    return [{'le': bound, 'count': count} for bound, count in zip(bounds, slots)]
+
+
+class RequestStats:
+    """Per-endpoint view of the request metrics plus a ring buffer of slow statements.
+
+    The numbers come from the same histograms /metrics serves (see metrics.py),
+    so every request is timed once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+    def record_slow(self, endpoint, slow):
+        with self._lock:
+            for statement, duration_ms in slow:
+                self.slow_queries.append({'endpoint': endpoint, 'ms': round(duration_ms, 2),
+                                          'statement': statement, 'at': time.time()})
+
+    def snapshot(self):
+        latency, db_time, queries = REQUEST_LATENCY.collect(), REQUEST_DB_TIME.collect(), REQUEST_QUERIES.collect()
+        endpoints = {}
+        for labels, slots in sorted(latency.items(), key=lambda item: item[0][1]):
+            requests = slots[-1] or 1
+            query_slots = queries.get(labels, [0] * len(slots))
+            endpoints[labels[1]] = {
+                'requests': slots[-1],
+                'avg_ms': round(slots[-2] / requests * 1000, 2),
+                'avg_db_ms': round(db_time.get(labels, [0] * len(slots))[-2] / requests * 1000, 2),
+                'avg_queries': round(query_slots[-2] / requests, 2),
+                'latency_ms': _buckets(REQUEST_LATENCY, slots, 1000),
+                'queries': _buckets(REQUEST_QUERIES, query_slots),
+            }
+        with self._lock:
+            return {'endpoints': endpoints, 'slow_queries': list(self.slow_queries)}
+
+    def reset(self):
+        for metric in REQUEST_METRICS:
+            metric.reset()
+        with self._lock:
+            self.slow_queries.clear()
+
+
+def request_stats(app=None):
+    return (app or current_app).extensions['request_stats']
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_request_context():
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    g.sql_queries = g.get('sql_queries', 0) + 1
+    g.sql_ms = g.get('sql_ms', 0.0) + elapsed_ms
+    if elapsed_ms >= g.get('slow_query_ms', float('inf')):
+        g.setdefault('sql_slow', []).append((statement, elapsed_ms))
+
+
+def _labels():
+    return request.blueprint or '', request.endpoint or 'unmatched'
+
+
+def init_instrumentation(app, engine):
+    """Time every request once and count its queries and DB time.
+
+    The results feed the request series in metrics.py (served at /metrics and,
+    per endpoint, at /admin/metrics) and the slow-query log. With
+    SERVER_TIMING on (the development profile) each response carries
+    `Server-Timing: db;dur=..;desc="N queries", app;dur=..`, which browser
+    dev tools show next to the request.
+    """
+    app.extensions['request_stats'] = stats = RequestStats()
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.slow_query_ms = app.config.get('SLOW_QUERY_MS', 100)
+        IN_FLIGHT.inc(request.blueprint or '')
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        queries, db_ms = g.get('sql_queries', 0), g.get('sql_ms', 0.0)
+        slow = g.get('sql_slow', [])
+        for statement, duration_ms in slow:
+            logger.warning('Slow query in %s', request.endpoint,
+                           extra={'duration_ms': round(duration_ms, 2), 'statement': statement})
+        blueprint, endpoint = _labels()
+        REQUESTS.inc(blueprint, endpoint, request.method, str(response.status_code))
+        REQUEST_LATENCY.observe(elapsed, blueprint, endpoint)
+        REQUEST_DB_TIME.observe(db_ms / 1000, blueprint, endpoint)
+        REQUEST_QUERIES.observe(queries, blueprint, endpoint)
+        stats.record_slow(endpoint, slow)
+        g.request_recorded = True
+        if app.config.get('SERVER_TIMING'):
+            response.headers.add('Server-Timing', f'db;dur={db_ms:.2f};desc="{queries} queries"')
+            response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.2f}')
+        return response
+
+    @app.teardown_request
+    def finish_request(error=None):
+        if 'request_started' not in g:
+            return
+        IN_FLIGHT.dec(request.blueprint or '')
+        if not g.get('request_recorded'):
+            # the view raised and no response went through after_request
+            blueprint, endpoint = _labels()
+            REQUESTS.inc(blueprint, endpoint, request.method, '500')
+            REQUEST_LATENCY.observe(time.perf_counter() - g.request_started, blueprint, endpoint)
@@ -0,0 +1,123 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import has_request_context, request
+
+
+ROOT_LOGGER = 'website'  # every module logs to logging.getLogger(__name__) below this
+QUEUE_SIZE = 10000
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+_handler = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request info and any extras."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current request to the record while we are still on the request thread."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            record.endpoint = request.endpoint
+            record.remote_addr = request.remote_addr
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records from chatty loggers.
+
+    `rates` maps a logger name (or prefix, e.g. 'website.admin') to the share
+    of its DEBUG records to keep. INFO and above always pass.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or not self.rates:
+            return True
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition('.')[0]
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() flattens the record into a formatted string.
+        # Keep the fields and only render what can't cross threads safely.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass  # drop rather than block the request when the writer falls behind
+
+
+def init_logging(app):
+    """Route the app's logging through a queue drained by a background writer.
+
+    Request threads only build the record and put it on a bounded queue; a
+    QueueListener thread formats and writes it (JSON lines by default), so a
+    slow stdout never holds up a request.
+    """
+    global _listener, _handler
+    config = app.config
+    if _listener is None:
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter() if config.get('LOG_FORMAT', 'json') == 'json'
+                            else logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        _handler = _QueueHandler(queue.Queue(QUEUE_SIZE))
+        _handler.addFilter(RequestContextFilter())
+        _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+    _handler.filters = [f for f in _handler.filters if not isinstance(f, SamplingFilter)]
+    _handler.addFilter(SamplingFilter(config.get('LOG_SAMPLE_RATES', {})))
+
+    root = logging.getLogger(ROOT_LOGGER)
+    if _handler not in root.handlers:
+        root.addHandler(_handler)
+    root.setLevel(config.get('LOG_LEVEL', 'INFO'))
+    root.propagate = False
+    for name, level in config.get('LOG_LEVELS', {}).items():
+        logging.getLogger(name).setLevel(level)
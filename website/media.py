@@ -0,0 +1,99 @@
+import hashlib
+import mimetypes
+import os
+import re
+
+from flask import abort, current_app, make_response, request, send_file, url_for
+from werkzeug.security import safe_join
+
+
+ONE_YEAR = 31536000
+
+# Names written by images.py start with a content hash, so the URL itself
+# changes whenever the bytes do.
+_HASHED_NAME = re.compile(r'^[0-9a-f]{20}(-[a-z]+)?\.[a-z0-9]+$')
+
+_fingerprints = {}
+
+
+def fingerprint(path):
+    """Short content hash of a media file, cached until its mtime or size changes."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _fingerprints.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(chunk)
+        digest = sha.hexdigest()[:16]
+        _fingerprints[key] = digest
+    return digest
+
+
+def is_hashed_name(filename):
+    return bool(_HASHED_NAME.match(os.path.basename(filename)))
+
+
+def media_url(path):
+    """Cache-forever URL for a stored './media/x' (or 'media/x') path.
+
+    Content-hashed names are used as they are; anything else gets ?v=<hash>
+    appended so the URL changes when the file does.
+    """
+    if not path:
+        return ''
+    for prefix in ('./media/', 'media/'):
+        if path.startswith(prefix):
+            filename = path[len(prefix):]
+            break
+    else:
+        return path  # external URL or a static asset
+    if is_hashed_name(filename):
+        return url_for('admin.get_image', filename=filename)
+    try:
+        full_path = safe_join(current_app.config['MEDIA_FOLDER'], filename)
+        version = fingerprint(full_path) if full_path else None
+    except OSError:
+        version = None  # missing file: let the request 404
+    return url_for('admin.get_image', filename=filename, v=version)
+
+
+def serve_media(filename):
+    """Send a media file with a strong ETag and long-lived caching.
+
+    Requests for the current fingerprint (or a content-hashed name) are
+    marked immutable; anything else must revalidate, which is answered with
+    a 304 when the ETag still matches. With MEDIA_OFFLOAD set, the file body
+    is left to the front proxy (X-Sendfile or nginx X-Accel-Redirect).
+    """
+    config = current_app.config
+    path = safe_join(config['MEDIA_FOLDER'], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    etag = fingerprint(path)
+    immutable = is_hashed_name(filename) or request.args.get('v') == etag
+    offload = config.get('MEDIA_OFFLOAD')
+
+    if offload == 'x-accel':
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = config['MEDIA_ACCEL_PREFIX'].rstrip('/') + '/' + filename
+        response.content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response.set_etag(etag)
+        response.make_conditional(request)
+    else:
+        # send_file handles If-None-Match / If-Modified-Since and Range, and
+        # emits X-Sendfile itself when USE_X_SENDFILE is on.
+        response = send_file(path, etag=etag, conditional=True, max_age=None)
+
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.no_cache = None
+        response.cache_control.max_age = ONE_YEAR
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = 0
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,222 @@
+import threading
+from bisect import bisect_left
+
+from flask import Response, current_app, request
+from flask_login import current_user
+from .cache import catalog_cache
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """A named series rendered in the Prometheus text format.
+
+    Each thread records into its own shard, so the request path is a plain
+    dict update with no lock. Scrapes sum the shards; shards of threads that
+    have exited are folded into a retired total, so the thread-per-request
+    dev server doesn't pile them up.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []   # (thread, values) for every thread that has recorded something
+        self._retired = {}  # merged values of threads that have exited
+        REGISTRY.append(self)
+
+    def _values(self):
+        values = getattr(self._local, 'values', None)
+        if values is None:
+            values = self._local.values = {}
+            with self._lock:
+                self._retire_dead_threads()
+                self._shards.append((threading.current_thread(), values))
+        return values
+
+    def _retire_dead_threads(self):
+        live = []
+        for thread, values in self._shards:
+            if thread.is_alive():
+                live.append((thread, values))
+            else:
+                self._merge(self._retired, values)
+        self._shards = live
+
+    def _merge(self, into, values):
+        for labels, value in list(values.items()):
+            into[labels] = into.get(labels, 0) + value
+
+    def collect(self):
+        """Sum of every thread's values, keyed by label tuple."""
+        with self._lock:
+            self._retire_dead_threads()
+            total = {}
+            self._merge(total, self._retired)
+            for _, values in self._shards:
+                self._merge(total, values)
+        return total
+
+    def reset(self):
+        with self._lock:
+            self._retired.clear()
+            for _, values in self._shards:
+                values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in sorted(self.collect().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        values = self._values()
+        values[labels] = values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        values = self._values()
+        values[labels] = values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, *labels):
+        values = self._values()
+        slots = values.get(labels)
+        if slots is None:
+            # one count per bucket (+Inf last), then sum and count
+            slots = values[labels] = [0] * (len(self.buckets) + 3)
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-2] += value
+        slots[-1] += 1
+
+    def _merge(self, into, values):
+        for labels, slots in list(values.items()):
+            target = into.get(labels)
+            if target is None:
+                into[labels] = list(slots)
+            else:
+                for i, value in enumerate(slots):
+                    target[i] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, slots in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), slots):
+                cumulative += count
+                le = ('le', '+Inf' if bound == float('inf') else repr(bound))
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(slots[-2])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {slots[-1]}')
+        return lines
+
+
+class CallbackMetric:
+    """Value read from elsewhere at scrape time (e.g. the catalog cache's own counters)."""
+
+    def __init__(self, name, documentation, kind, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, value in self.callback():
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+REGISTRY = []
+
+REQUESTS = Counter('sajilo_http_requests_total', 'HTTP requests handled.',
+                   ('blueprint', 'endpoint', 'method', 'status'))
+REQUEST_LATENCY = Histogram('sajilo_http_request_duration_seconds', 'Time spent handling a request.',
+                            ('blueprint', 'endpoint'))
+REQUEST_DB_TIME = Histogram('sajilo_http_request_db_seconds', 'Time spent in SQL per request.',
+                            ('blueprint', 'endpoint'))
+REQUEST_QUERIES = Histogram('sajilo_http_request_queries', 'SQL statements run per request.',
+                            ('blueprint', 'endpoint'), buckets=QUERY_BUCKETS)
+IN_FLIGHT = Gauge('sajilo_http_requests_in_flight', 'Requests currently being handled.', ('blueprint',))
+CHECKOUTS = Counter('sajilo_checkouts_total', 'Checkout attempts by outcome.', ('result',))
+GATEWAY_LATENCY = Histogram('sajilo_payment_gateway_duration_seconds', 'Khalti verification round trips.',
+                            ('outcome',))
+RATE_LIMITED = Counter('sajilo_rate_limited_total', 'Requests rejected by the rate limiter.', ('scope', 'key'))
+
+
+def _cache_lookups():
+    stats = catalog_cache().stats()
+    return [(('hit',), stats['hits']), (('miss',), stats['misses'])]
+
+
+CACHE_LOOKUPS = CallbackMetric('sajilo_catalog_cache_lookups_total', 'Catalog cache lookups.', 'counter',
+                               ('result',), _cache_lookups)
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app):
+    """Serve the metrics at /metrics; the request series are recorded by instrumentation.py.
+
+    Scrapes must send `Authorization: Bearer <METRICS_TOKEN>`, or, with no
+    token configured, come from a logged-in admin.
+    """
+
+    def scrape():
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            if request.headers.get('Authorization') != f'Bearer {token}':
+                return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        elif not (current_user.is_authenticated and current_user.is_admin):
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(render_metrics(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'metrics', scrape)
@@ -1,7 +1,11 @@
 from . import db
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from .passwords import password_policy
+
+
+ROLE_CUSTOMER = 'customer'
+ROLE_ADMIN = 'admin'
 
 
 class Customer(db.Model, UserMixin):
@@ -10,6 +14,7 @@ class Customer(db.Model, UserMixin):
     username = db.Column(db.String(100))
     password_hash = db.Column(db.String(150))
     date_joined = db.Column(db.DateTime(), default=datetime.utcnow)
+    role = db.Column(db.String(20), nullable=False, default=ROLE_CUSTOMER, server_default=ROLE_CUSTOMER)
 
     cart_items = db.relationship(
         'Cart', backref=db.backref('customer', lazy=True), cascade="all, delete-orphan"
@@ -31,10 +36,18 @@ class Customer(db.Model, UserMixin):
     
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password= password)
+        self.password_hash = password_policy().hash(password)
         
+    @property
+    def is_admin(self):
+        return self.role == ROLE_ADMIN
+
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password= password)
+        """Check a password, upgrading password_hash if it was made with outdated settings."""
+        matches, new_hash = password_policy().verify(self.password_hash, password)
+        if new_hash:
+            self.password_hash = new_hash
+        return matches
     
     def __str__(self):
         return f'<Customer {self.id}>'
@@ -58,7 +71,8 @@ class Product(db.Model):
         in_stock = db.Column(db.Integer)
         product_picture = db.Column(db.String(255), nullable=True)
         flash_sale = db.Column(db.Boolean, default=False)
-        date_added = db.Column(db.DateTime, default=datetime.utcnow)
+        date_added = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # keyset sort key, see pagination.py
+        image_variants = db.Column(db.JSON, nullable=True)  # resized WebP/JPEG copies, see images.py
         category_id = db.Column(
             db.Integer,
             db.ForeignKey('category.id', name='fk_category_product'),
@@ -67,6 +81,13 @@ class Product(db.Model):
 
         carts = db.relationship('Cart', backref=db.backref('product', lazy=True))
         orders = db.relationship('Order', backref=db.backref('product', lazy=True))
+
+        # Composite indexes for the keyset-paginated listings (see pagination.py)
+        __table_args__ = (
+            db.Index('ix_product_category_id_date_added', 'category_id', 'date_added'),
+            db.Index('ix_product_flash_sale_date_added', 'flash_sale', 'date_added'),
+            db.Index('ix_product_date_added', 'date_added'),
+        )
         
         def __str__(self):
             return '<Product %r>' % self.product_name
@@ -79,6 +100,11 @@ class Cart(db.Model):
     
     customer_link= db.Column(db.Integer, db.ForeignKey('customer.id'), nullable= False)
     product_link= db.Column(db.Integer, db.ForeignKey('product.id'), nullable= False)
+
+    # One line per product per customer; adds upsert into it (see cart.py)
+    __table_args__ = (
+        db.Index('uq_cart_customer_link_product_link', 'customer_link', 'product_link', unique=True),
+    )
     
     def __str__(self):
         return '<Cart %r>' %self.id
@@ -97,13 +123,77 @@ class Order(db.Model):
     
     
     
+    date_created= db.Column(db.DateTime, default=datetime.utcnow)
+    
+    
+    
     customer_link= db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=False)
     product_link= db.Column(db.Integer, db.ForeignKey('product.id'), nullable= True)
+    # What was sold, kept after product_link is cleared by a product deletion
+    # so the sales rollups can still be adjusted for this order
+    sold_product_id = db.Column(db.Integer)
+    sold_category_id = db.Column(db.Integer)
     
     
     
+    # Filters and sort keys of the admin order view
+    __table_args__ = (
+        db.Index('ix_order_status', 'status'),
+        db.Index('ix_order_customer_link', 'customer_link'),
+        db.Index('ix_order_product_link', 'product_link'),
+        db.Index('ix_order_date_created', 'date_created'),
+    )
+    
     def __str__(self):
         return '<Order %r>' %self.id
+
+
+class PaymentVerification(db.Model):
+    """A background Khalti verification the browser polls (see payments.py).
+
+    Kept in the database rather than process memory so the poll can land on
+    any worker process.
+    """
+    id = db.Column(db.String(32), primary_key=True)
+    customer_id = db.Column(db.Integer, nullable=False)  # no FK: outlives deleted customers until pruned
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    success = db.Column(db.Boolean)
+    message = db.Column(db.String(255))
+    date_created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __str__(self):
+        return f'<PaymentVerification {self.id}>'
+
+
+
+# Sales rollups, kept up to date by checkout and order status changes
+# (see reports.py) so the dashboard never has to scan the order table.
+class DailySales(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ProductSales(db.Model):
+    product_id = db.Column(db.Integer, primary_key=True)  # no FK: history outlives deleted products
+    product_name = db.Column(db.String(100))
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_product_sales_revenue', 'revenue'),
+        db.Index('ix_product_sales_units', 'units'),
+    )
+
+
+class CategorySales(db.Model):
+    category_id = db.Column(db.Integer, primary_key=True)
+    category_name = db.Column(db.String(100))
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
     
 
 
@@ -113,7 +203,13 @@ class ContactMessage(db.Model):
     message = db.Column(db.Text, nullable=False)
     email = db.Column(db.String(100), nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    date_submitted = db.Column(db.DateTime, default=datetime.utcnow)
+    date_submitted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    is_read = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    __table_args__ = (
+        db.Index('ix_contact_message_date_submitted', 'date_submitted'),
+        db.Index('ix_contact_message_is_read_date_submitted', 'is_read', 'date_submitted'),
+    )
 
     def __str__(self):
         return f'<ContactMessage {self.id}>'
@@ -140,6 +236,11 @@ class Wishlist(db.Model):
     customer = db.relationship('Customer', backref=db.backref('wishlist_items', cascade='all, delete-orphan', passive_deletes=True))
     product = db.relationship('Product', backref='wishlists')
 
+    # A product is on a customer's wishlist at most once (see wishlist.py)
+    __table_args__ = (
+        db.Index('uq_wishlist_customer_id_product_id', 'customer_id', 'product_id', unique=True),
+    )
+
     def __repr__(self):
         return f'<Wishlist {self.id} - Product {self.product_id}>'
     
@@ -0,0 +1,86 @@
+import base64
+from datetime import datetime
+
+from flask import current_app, request, url_for
+from sqlalchemy import tuple_
+from .models import Product
+
+
+DEFAULT_PAGE_SIZE = 24
+
+
+class Page:
+    """One keyset page: the rows plus the cursor for the page after it."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(value, row_id):
+    raw = f'{value.isoformat() if isinstance(value, datetime) else value}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, value_type=datetime):
+    """Return (value, id) from a cursor string, or None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, row_id = raw.rsplit('|', 1)
+        value = datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+        return value, int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_size():
+    return current_app.config.get('PRODUCTS_PER_PAGE', DEFAULT_PAGE_SIZE)
+
+
+def keyset_page(query, sort_column, id_column, cursor=None, per_page=None, descending=False,
+                value_type=datetime):
+    """Page through `query` ordered by (sort_column, id_column).
+
+    Instead of OFFSET, the next page starts strictly after the last row we
+    returned (WHERE (sort, id) > (:last_sort, :last_id)), so every page is a
+    short index range scan no matter how deep the user has clicked.
+    Both columns must be NOT NULL: a NULL never compares greater or less
+    than the cursor, so those rows could not be reached past page one.
+    """
+    per_page = per_page or page_size()
+    key = tuple_(sort_column, id_column)
+    if cursor:
+        after = decode_cursor(cursor, value_type)
+        if after is not None:
+            query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column, id_column)
+
+    rows = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return Page(rows, next_cursor)
+
+
+def product_page(query, descending=True, per_page=None):
+    """Keyset page of Products by date_added, reading ?cursor= from the request."""
+    return keyset_page(query, Product.date_added, Product.id, cursor=request.args.get('cursor'),
+                       per_page=per_page, descending=descending)
+
+
+def page_url(cursor=None):
+    """URL of the current view with its filters kept and ?cursor= replaced."""
+    args = request.args.to_dict()
+    args.pop('cursor', None)
+    if cursor:
+        args['cursor'] = cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
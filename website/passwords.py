@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Response, current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+# Werkzeug's own defaults for parameters left out of a method string
+_METHOD_DEFAULTS = {
+    'scrypt': ['32768', '8', '1'],
+    'pbkdf2': ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)],
+}
+
+
+class HasherBusy(RuntimeError):
+    """Too many password hashes are already queued; the request should be retried later."""
+
+
+def full_method(method):
+    """Spell out a Werkzeug method string the way it is written into the hash.
+
+    'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2:sha512' -> 'pbkdf2:sha512:1000000'.
+    """
+    name, _, params = method.partition(':')
+    if name not in _METHOD_DEFAULTS:
+        raise ValueError(f'Unsupported password hash method {method!r}')
+    given = params.split(':') if params else []
+    return ':'.join([name] + given + _METHOD_DEFAULTS[name][len(given):])
+
+
+def _verify(stored_hash, password, rehash_method=None):
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if rehash_method:
+        return True, generate_password_hash(password, rehash_method)
+    return True, None
+
+
+class PasswordPolicy:
+    """Hashes and checks passwords with one configured method on a small worker pool.
+
+    At most `workers` hashes run at once and at most `max_pending` may be
+    running or queued; past that, HasherBusy is raised straight away. A login
+    storm therefore takes a bounded share of the CPU and gets fast 503s
+    instead of every request thread piling up behind scrypt.
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_pending=64):
+        self.method = full_method(method)
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='password-hash')
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self.method
+
+    def verify(self, stored_hash, password):
+        """(matches, new_hash): new_hash is set when a correct password was stored with old parameters."""
+        if not stored_hash:
+            return False, None
+        rehash_method = self.method if self.needs_rehash(stored_hash) else None
+        return self._run(_verify, stored_hash, password, rehash_method)
+
+
+def _busy(error):
+    return Response('Too many sign-ins at once, please try again in a moment.\n', status=503,
+                    mimetype='text/plain', headers={'Retry-After': '1'})
+
+
+def init_passwords(app):
+    config = app.config
+    app.extensions['passwords'] = PasswordPolicy(config.get('PASSWORD_HASH_METHOD', 'scrypt'),
+                                                 config.get('PASSWORD_HASH_WORKERS', 2),
+                                                 config.get('PASSWORD_HASH_MAX_PENDING', 64))
+    app.register_error_handler(HasherBusy, _busy)
+
+
+def password_policy():
+    return current_app.extensions['passwords']
@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+from sqlalchemy import delete
+from urllib3.util.retry import Retry
+
+from . import db
+from .checkout import checkout_cart, CheckoutError
+from .metrics import CHECKOUTS, GATEWAY_LATENCY
+from .models import PaymentVerification
+
+
+logger = logging.getLogger(__name__)
+
+KHALTI_VERIFY_URL = 'https://khalti.com/api/v2/payment/verify/'
+
+
+class PaymentGatewayError(Exception):
+    pass
+
+
+class KhaltiClient:
+    """Keep-alive client for the Khalti verification API.
+
+    One pooled session is shared by all workers; every call has a connect/read
+    timeout and transient failures (connection errors, 502/503/504) are retried
+    a bounded number of times with backoff.
+    """
+
+    def __init__(self, secret_key, verify_url=KHALTI_VERIFY_URL, timeout=(3.05, 10),
+                 retries=2, pool_size=10):
+        self.verify_url = verify_url
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.3,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'POST'}),  # verification is idempotent
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Authorization'] = f'Key {secret_key}'
+
+    def verify(self, token, amount):
+        """Return True when Khalti confirms the payment."""
+        try:
+            response = self.session.post(self.verify_url, data={'token': token, 'amount': amount},
+                                         timeout=self.timeout)
+        except requests.RequestException as e:
+            raise PaymentGatewayError(f'Khalti unreachable: {e}') from e
+        if response.status_code != 200:
+            return False
+        try:
+            return bool(response.json().get('idx'))
+        except ValueError:
+            return False
+
+    def close(self):
+        self.session.close()
+
+
+def get_gateway(app=None):
+    """The app's shared KhaltiClient, built from config on first use."""
+    app = app or current_app._get_current_object()
+    client = app.extensions.get('khalti')
+    if client is None:
+        config = app.config
+        client = KhaltiClient(
+            secret_key=config['KHALTI_SECRET_KEY'],
+            verify_url=config.get('KHALTI_VERIFY_URL', KHALTI_VERIFY_URL),
+            timeout=(config.get('KHALTI_CONNECT_TIMEOUT', 3.05), config.get('KHALTI_READ_TIMEOUT', 10)),
+            retries=config.get('KHALTI_RETRIES', 2),
+            pool_size=config.get('KHALTI_POOL_SIZE', 10),
+        )
+        app.extensions['khalti'] = client
+    return client
+
+
+def verify_and_checkout(customer_id, token, amount, app=None):
+    """Verify a payment and, if it went through, place the customer's orders."""
+    started = time.perf_counter()
+    try:
+        paid = get_gateway(app).verify(token, amount)
+    except PaymentGatewayError as e:
+        GATEWAY_LATENCY.observe(time.perf_counter() - started, 'error')
+        CHECKOUTS.inc('gateway_error')
+        logger.error('Khalti verification error: %s', e)
+        return {'success': False, 'message': 'Payment gateway unavailable'}
+    GATEWAY_LATENCY.observe(time.perf_counter() - started, 'paid' if paid else 'declined')
+    if not paid:
+        CHECKOUTS.inc('declined')
+        return {'success': False, 'message': 'Payment verification failed'}
+    try:
+        checkout_cart(customer_id, payment_id=token)
+    except CheckoutError as e:
+        CHECKOUTS.inc('rejected')
+        logger.info('Checkout rejected: %s', e, extra={'customer_id': customer_id})
+        return {'success': False, 'message': str(e)}
+    CHECKOUTS.inc('success')
+    return {'success': True}
+
+
+# Background verification: the request thread only queues the job and the
+# browser polls for the result, so a slow gateway can't pin web workers. Job
+# state lives in the payment_verification table so any worker process can
+# answer the poll; the verification itself runs in the submitting process.
+JOB_RETENTION = timedelta(days=1)
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=app.config.get('KHALTI_VERIFY_WORKERS', 4),
+                                           thread_name_prefix='khalti-verify')
+    return _executor
+
+
+def _run_job(app, job_id, customer_id, token, amount):
+    with app.app_context():
+        try:
+            result = verify_and_checkout(customer_id, token, amount, app=app)
+        except Exception:
+            logger.exception('Khalti background verification error')
+            db.session.rollback()
+            result = {'success': False, 'message': 'Verification failed'}
+        job = db.session.get(PaymentVerification, job_id)
+        job.status = 'done'
+        job.success = result['success']
+        job.message = result.get('message')
+        db.session.commit()
+
+
+def submit_verification(customer_id, token, amount):
+    """Queue a verification and return its job id for polling."""
+    app = current_app._get_current_object()
+    job_id = uuid.uuid4().hex
+    db.session.execute(delete(PaymentVerification)
+                       .where(PaymentVerification.date_created < datetime.utcnow() - JOB_RETENTION))
+    db.session.add(PaymentVerification(id=job_id, customer_id=customer_id))
+    db.session.commit()  # before the job starts, so it can find its row
+    _get_executor(app).submit(_run_job, app, job_id, customer_id, token, amount)
+    return job_id
+
+
+def verification_status(job_id, customer_id):
+    """The job's public state, or None if it doesn't exist for this customer."""
+    job = db.session.get(PaymentVerification, job_id)
+    if job is None or job.customer_id != customer_id:
+        return None
+    if job.status != 'done':
+        return {'status': job.status}
+    status = {'status': job.status, 'success': job.success}
+    if job.message:
+        status['message'] = job.message
+    return status
@@ -0,0 +1,134 @@
+from functools import wraps
+
+import click
+from flask import Response, current_app, g
+from flask.cli import AppGroup
+from flask_login import current_user
+from sqlalchemy import select, update
+from .cache import MemoryCache
+from .models import Customer, ROLE_ADMIN, ROLE_CUSTOMER
+from . import db
+
+
+class SessionPrincipal:
+    """What Flask-Login keeps as current_user: just enough to authorize a request.
+
+    Built from a narrow SELECT (no password hash) and cached, so ordinary
+    logged-in requests don't touch the customer table at all. Use
+    current_customer() in the few places that need the full ORM row.
+    """
+
+    __slots__ = ('id', 'email', 'username', 'role')
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, email, username, role):
+        self.id = id
+        self.email = email
+        self.username = username
+        self.role = role
+
+    @property
+    def is_admin(self):
+        return self.role == ROLE_ADMIN
+
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        return isinstance(other, SessionPrincipal) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<SessionPrincipal {self.id}>'
+
+
+def init_principals(app, backend=None):
+    """Cache principals in `backend`, PRINCIPAL_CACHE_BACKEND, or a per-process MemoryCache.
+
+    Only a backend shared by every worker lets forget_principal() take effect
+    immediately; with the per-process default, other workers keep a stale
+    principal until PRINCIPAL_CACHE_TTL (PRINCIPAL_ADMIN_CACHE_TTL for admins)
+    runs out.
+    """
+    app.extensions['principals'] = (backend or app.config.get('PRINCIPAL_CACHE_BACKEND')
+                                    or MemoryCache(app.config.get('PRINCIPAL_CACHE_SIZE', 10000)))
+
+
+def load_principal(customer_id):
+    """Flask-Login user_loader: the cached principal, or one narrow query on a miss."""
+    cache = current_app.extensions['principals']
+    # Plain tuples, so a shared backend can store them
+    row = cache.get(customer_id)
+    if row is None:
+        row = db.session.execute(
+            select(Customer.id, Customer.email, Customer.username, Customer.role).where(Customer.id == customer_id)
+        ).first()
+        if row is None:
+            return None
+        row = tuple(row)
+        config = current_app.config
+        ttl = (config.get('PRINCIPAL_ADMIN_CACHE_TTL', 5) if row[3] == ROLE_ADMIN
+               else config.get('PRINCIPAL_CACHE_TTL', 60))
+        cache.set(customer_id, row, ttl)
+    return SessionPrincipal(*row)
+
+
+def forget_principal(customer_id):
+    """Drop a cached principal; call after a password, role or account change.
+
+    With the per-process default cache this only affects the calling process,
+    see init_principals().
+    """
+    current_app.extensions['principals'].delete(customer_id)
+
+
+def current_customer():
+    """The logged-in Customer as a full ORM row, loaded once per request."""
+    if not current_user.is_authenticated:
+        return None
+    if 'current_customer' not in g:
+        g.current_customer = db.session.get(Customer, current_user.id)
+    return g.current_customer
+
+
+def admin_required(view):
+    """Like login_required, but the principal must also have the admin role.
+
+    The role comes with the cached principal, so the check costs no query.
+    Logged-in non-admins get a bare 403 rather than a rendered page.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return current_app.login_manager.unauthorized()
+        if not current_user.is_admin:
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return view(*args, **kwargs)
+    return wrapper
+
+
+roles_cli = AppGroup('roles', help='Customer roles.')
+
+
+@roles_cli.command('set')
+@click.argument('email')
+@click.argument('role', type=click.Choice([ROLE_CUSTOMER, ROLE_ADMIN]))
+def set_role(email, role):
+    """Give the customer with EMAIL the role ROLE."""
+    customer_id = db.session.execute(
+        update(Customer).where(Customer.email == email).values(role=role).returning(Customer.id)
+    ).scalar()
+    if customer_id is None:
+        raise click.ClickException(f'No customer with email {email}')
+    db.session.commit()
+    forget_principal(customer_id)
+    click.echo(f'{email} is now {role}.')
+    if isinstance(current_app.extensions['principals'], MemoryCache):
+        # This process's cache is not the web workers'
+        ttl = current_app.config.get('PRINCIPAL_ADMIN_CACHE_TTL' if role == ROLE_CUSTOMER else 'PRINCIPAL_CACHE_TTL')
+        click.echo(f'Running web workers pick this up within {ttl} seconds.')
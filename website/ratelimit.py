@@ -0,0 +1,124 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, request
+from .metrics import RATE_LIMITED
+
+
+class LimitBackend:
+    """Storage interface for the rate limiter's token buckets.
+
+    MemoryBuckets below is per-process, so with several worker processes
+    each one enforces its own limits. A shared store (e.g. Redis running the
+    same arithmetic in a Lua script) only has to implement take() to be
+    dropped in via init_rate_limits(app, backend=...).
+    """
+
+    def take(self, key, capacity, rate):
+        """Spend one token from `key`'s bucket.
+
+        The bucket holds up to `capacity` tokens and refills at `rate` tokens
+        per second. Returns 0.0 if a token was spent, otherwise the seconds
+        until one will be available.
+        """
+        raise NotImplementedError
+
+
+class MemoryBuckets(LimitBackend):
+    """Thread-safe token buckets as (tokens, last update) pairs, least recently used evicted first.
+
+    Evicting a bucket only forgets how much of it was spent, so an evicted
+    client starts again with a full bucket.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                self._buckets.move_to_end(key)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RateLimiter:
+    """Applies the RATE_LIMITS rules for a scope to the client IP and the submitted email."""
+
+    def __init__(self, backend, rules, enabled=True):
+        self.backend = backend
+        self.rules = rules
+        self.enabled = enabled
+
+    def check(self, scope, ip, email=None):
+        """(key kind, seconds to wait) for the first exhausted limit, or None if the request may go ahead."""
+        if not self.enabled:
+            return None
+        for kind, value in (('ip', ip), ('email', email)):
+            limit = self.rules.get(scope, {}).get(kind)
+            if limit is None or not value:
+                continue
+            requests, seconds = limit
+            wait = self.backend.take(f'{scope}:{kind}:{value}', requests, requests / seconds)
+            if wait:
+                return kind, wait
+        return None
+
+
+def _normalize_email(email):
+    return (email or '').strip().lower()[:254]
+
+
+def rate_limited(scope):
+    """Throttle a form view's POSTs by client IP and submitted email.
+
+    Runs before the view body, so a rejected request costs no query, no
+    password hash and no template render, just a plain 429.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == 'POST':
+                limited = rate_limiter().check(scope, request.remote_addr,
+                                               _normalize_email(request.form.get('email')))
+                if limited:
+                    kind, wait = limited
+                    RATE_LIMITED.inc(scope, kind)
+                    return Response('Too many attempts, please wait a moment and try again.\n', status=429,
+                                    mimetype='text/plain', headers={'Retry-After': str(math.ceil(wait))})
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_rate_limits(app, backend=None):
+    config = app.config
+    app.extensions['rate_limits'] = RateLimiter(
+        backend or MemoryBuckets(config.get('RATE_LIMIT_MAX_KEYS', 100000)),
+        config.get('RATE_LIMITS', {}),
+        enabled=config.get('RATE_LIMIT_ENABLED', True),
+    )
+
+
+def rate_limiter():
+    return current_app.extensions['rate_limits']
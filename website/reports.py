@@ -0,0 +1,201 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import joinedload
+from .models import Category, CategorySales, DailySales, Order, Product, ProductSales
+from . import db, upsert_insert
+
+
+CANCELED = 'Canceled'
+MAX_SUMMARY_DAYS = 3650
+MAX_TOP_PRODUCTS = 100
+TOP_SELLER_COLUMNS = {'revenue': ProductSales.revenue, 'units': ProductSales.units}
+
+reports_cli = AppGroup('reports', help='Sales rollup maintenance.')
+
+
+def sale_line(quantity, price, day=None, product_id=None, product_name=None,
+              category_id=None, category_name=None):
+    """One sold order line, in the shape record_sales() expects."""
+    return {
+        'quantity': quantity, 'price': price, 'day': day,
+        'product_id': product_id, 'product_name': product_name,
+        'category_id': category_id, 'category_name': category_name,
+    }
+
+
+def order_sale_line(order):
+    # The sold_* snapshot is what the rollups were credited with, even if the
+    # product has since been deleted or moved to another category
+    product = order.product
+    product_id = order.sold_product_id if order.sold_product_id is not None else order.product_link
+    category_id = order.sold_category_id
+    if category_id is None and product is not None:
+        category_id = product.category_id
+    category = product.category if product is not None and product.category_id == category_id else None
+    return sale_line(
+        order.quantity, order.price,
+        day=order.date_created.date() if order.date_created else None,
+        product_id=product_id, product_name=product.product_name if product else None,
+        category_id=category_id, category_name=category.name if category else None,
+    )
+
+
+def _increment(model, key, labels, revenue, units, orders):
+    """Add the deltas to one rollup row, creating it if needed (single UPSERT)."""
+    table = model.__table__
+    values = {**key, **labels, 'revenue': revenue, 'units': units, 'orders': orders}
+    upsert = upsert_insert(table)
+    if upsert is not None:
+        upsert = upsert.values(**values)
+        excluded = upsert.excluded
+        db.session.execute(upsert.on_conflict_do_update(
+            index_elements=list(key),
+            set_={
+                'revenue': table.c.revenue + excluded.revenue,
+                'units': table.c.units + excluded.units,
+                'orders': table.c.orders + excluded.orders,
+                **{name: excluded[name] for name in labels},
+            },
+        ))
+        return
+    result = db.session.execute(
+        update(table)
+        .where(*(table.c[name] == value for name, value in key.items()))
+        .values(revenue=table.c.revenue + revenue, units=table.c.units + units,
+                orders=table.c.orders + orders, **labels)
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(**values))
+
+
+def record_sales(lines, sign=1):
+    """Fold order lines into the rollups; sign=-1 takes them back out.
+
+    Runs inside the caller's transaction so the rollups commit (or roll back)
+    together with the orders themselves.
+    """
+    daily = defaultdict(lambda: [0.0, 0, 0])
+    products = defaultdict(lambda: [0.0, 0, 0])
+    categories = defaultdict(lambda: [0.0, 0, 0])
+    product_names, category_names = {}, {}
+    for line in lines:
+        delta = (sign * line['price'] * line['quantity'], sign * line['quantity'], sign)
+        buckets = [(daily, line['day'])]
+        if line['product_id'] is not None:
+            buckets.append((products, line['product_id']))
+            product_names[line['product_id']] = line['product_name']
+        if line['category_id'] is not None:
+            buckets.append((categories, line['category_id']))
+            category_names[line['category_id']] = line['category_name']
+        for bucket, key in buckets:
+            if key is None:
+                continue  # legacy orders without a date stay out of the daily table
+            totals = bucket[key]
+            for i, value in enumerate(delta):
+                totals[i] += value
+
+    for day, totals in daily.items():
+        _increment(DailySales, {'day': day}, {}, *totals)
+    for product_id, totals in products.items():
+        labels = {'product_name': product_names[product_id]} if product_names[product_id] else {}
+        _increment(ProductSales, {'product_id': product_id}, labels, *totals)
+    for category_id, totals in categories.items():
+        labels = {'category_name': category_names[category_id]} if category_names[category_id] else {}
+        _increment(CategorySales, {'category_id': category_id}, labels, *totals)
+
+
+def record_status_change(order, old_status):
+    """Keep rollups in step when an order moves into or out of Canceled."""
+    if old_status != CANCELED and order.status == CANCELED:
+        record_sales([order_sale_line(order)], sign=-1)
+    elif old_status == CANCELED and order.status != CANCELED:
+        record_sales([order_sale_line(order)])
+
+
+def record_order_deleted(order):
+    if order.status != CANCELED:
+        record_sales([order_sale_line(order)], sign=-1)
+
+
+def record_customer_deleted(customer_id):
+    """Take a customer's orders out of the rollups before the account (and its orders) is deleted."""
+    orders = (Order.query
+              .options(joinedload(Order.product).joinedload(Product.category))
+              .filter(Order.customer_link == customer_id, Order.status != CANCELED)
+              .all())
+    if orders:
+        record_sales([order_sale_line(order) for order in orders], sign=-1)
+
+
+def rebuild_rollups():
+    """Recompute every rollup table from the order history."""
+    for model in (DailySales, ProductSales, CategorySales):
+        db.session.execute(delete(model))
+    active = Order.status != CANCELED
+    measures = (func.sum(Order.price * Order.quantity), func.sum(Order.quantity), func.count(Order.id))
+
+    day = func.date(Order.date_created)
+    for row_day, revenue, units, orders in db.session.execute(
+            select(day, *measures).where(active, Order.date_created.isnot(None)).group_by(day)):
+        db.session.add(DailySales(day=datetime.strptime(str(row_day), '%Y-%m-%d').date(),
+                                  revenue=revenue, units=units, orders=orders))
+
+    product_key = func.coalesce(Order.sold_product_id, Order.product_link)
+    for product_id, name, revenue, units, orders in db.session.execute(
+            select(product_key, Product.product_name, *measures)
+            .outerjoin(Product, Product.id == product_key)
+            .where(active, product_key.isnot(None))
+            .group_by(product_key, Product.product_name)):
+        db.session.add(ProductSales(product_id=product_id, product_name=name,
+                                    revenue=revenue, units=units, orders=orders))
+
+    category_key = func.coalesce(Order.sold_category_id, Product.category_id)
+    for category_id, name, revenue, units, orders in db.session.execute(
+            select(category_key, Category.name, *measures)
+            .outerjoin(Product, Product.id == Order.product_link)
+            .outerjoin(Category, Category.id == category_key)
+            .where(active, category_key.isnot(None))
+            .group_by(category_key, Category.name)):
+        db.session.add(CategorySales(category_id=category_id, category_name=name,
+                                     revenue=revenue, units=units, orders=orders))
+    db.session.commit()
+
+
+def sales_summary(days=30):
+    """Revenue/units/orders per day for the last `days` days (1 to MAX_SUMMARY_DAYS) plus their totals."""
+    days = max(1, min(days, MAX_SUMMARY_DAYS))
+    since = datetime.utcnow().date() - timedelta(days=days - 1)
+    rows = DailySales.query.filter(DailySales.day >= since).order_by(DailySales.day).all()
+    return {
+        'days': days,
+        'revenue': sum(row.revenue for row in rows),
+        'units': sum(row.units for row in rows),
+        'orders': sum(row.orders for row in rows),
+        'daily': [{'day': row.day.isoformat(), 'revenue': row.revenue, 'units': row.units, 'orders': row.orders}
+                  for row in rows],
+    }
+
+
+def top_products(by='revenue', limit=10):
+    column = TOP_SELLER_COLUMNS.get(by, ProductSales.revenue)
+    limit = max(1, min(limit, MAX_TOP_PRODUCTS))
+    rows = ProductSales.query.filter(column > 0).order_by(column.desc()).limit(limit).all()
+    return [{'product_id': row.product_id, 'product_name': row.product_name,
+             'revenue': row.revenue, 'units': row.units, 'orders': row.orders} for row in rows]
+
+
+def category_breakdown():
+    rows = CategorySales.query.order_by(CategorySales.revenue.desc()).all()
+    return [{'category_id': row.category_id, 'category_name': row.category_name,
+             'revenue': row.revenue, 'units': row.units, 'orders': row.orders} for row in rows]
+
+
+@reports_cli.command('rebuild')
+def rebuild_command():
+    """Rebuild the sales rollups from the order table."""
+    rebuild_rollups()
+    click.echo('Sales rollups rebuilt.')
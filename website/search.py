@@ -0,0 +1,75 @@
+import re
+
+from sqlalchemy import column, literal_column, select, table, text
+from .models import Product
+from . import db
+
+
+SEARCH_RESULT_LIMIT = 100
+
+# External-content FTS5 index over product names. Triggers on `product` keep it
+# in sync with every insert/update/delete (admin forms, bulk imports, raw SQL),
+# so nothing in the app has to remember to reindex.
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+        product_name, content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS product_search_ai AFTER INSERT ON product BEGIN
+        INSERT INTO product_search(rowid, product_name) VALUES (new.id, new.product_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_search_ad AFTER DELETE ON product BEGIN
+        INSERT INTO product_search(product_search, rowid, product_name)
+        VALUES ('delete', old.id, old.product_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS product_search_au AFTER UPDATE OF product_name ON product BEGIN
+        INSERT INTO product_search(product_search, rowid, product_name)
+        VALUES ('delete', old.id, old.product_name);
+        INSERT INTO product_search(rowid, product_name) VALUES (new.id, new.product_name);
+    END""",
+]
+
+product_search = table('product_search', column('rowid'), column('rank'))
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+_has_index = {}
+
+
+def create_search_index(connection, rebuild=True):
+    """Create the FTS table and triggers (SQLite only) and fill it from `product`."""
+    for statement in SEARCH_INDEX_DDL:
+        connection.execute(text(statement))
+    if rebuild:
+        connection.execute(text("INSERT INTO product_search(product_search) VALUES ('rebuild')"))
+
+
+def search_index_available():
+    engine = db.engine
+    if engine.url not in _has_index:
+        _has_index[engine.url] = engine.dialect.name == 'sqlite' and db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_search'")
+        ).first() is not None
+    return _has_index[engine.url]
+
+
+def build_match_query(search_query):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    tokens = _TOKEN_RE.findall(search_query or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_products(search_query, limit=SEARCH_RESULT_LIMIT):
+    """Products matching `search_query`, best matches first."""
+    match = build_match_query(search_query)
+    if not match:
+        return []
+    if not search_index_available():
+        # No FTS index (server database or un-migrated SQLite): substring scan
+        return Product.query.filter(Product.product_name.ilike(f'%{search_query}%')).limit(limit).all()
+    statement = (
+        select(Product)
+        .join(product_search, product_search.c.rowid == Product.id)
+        .where(literal_column('product_search').op('MATCH')(match))
+        .order_by(product_search.c.rank)
+        .limit(limit)
+    )
+    return db.session.scalars(statement).all()
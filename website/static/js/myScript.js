@@ -1,72 +1,85 @@
-$('.plus-cart').click(function(){
-    console.log('Button clicked')
+// Cart clicks update the page straight away and are sent together: changes
+// made within CART_DEBOUNCE_MS of each other go out as one PATCH /cart.
+var CART_DEBOUNCE_MS = 400
+var pendingCart = {}
+var cartTimer = null
 
-    var id = $(this).attr('pid').toString()
-    var quantity = this.parentNode.children[2]
-
-    $.ajax({
-        type: 'GET',
-        url: '/pluscart',
-        data: {
-            cart_id: id
-        },
-        
-        success: function(data){
-            console.log(data)
-            quantity.innerText = data.quantity
-            document.getElementById(`quantity${id}`).innerText = data.quantity
-            document.getElementById('amount_tt').innerText = data.amount
-            document.getElementById('totalamount').innerText = data.total
-
-        }
+
+function cartQuantity(id){
+    return parseInt(document.getElementById(`quantity${id}`).innerText, 10)
+}
+
+
+function showLine(id, quantity){
+    if (quantity > 0) {
+        document.getElementById(`quantity${id}`).innerText = quantity
+        document.getElementById(`quantitySummary${id}`).innerText = quantity
+        return
+    }
+    var row = document.getElementById(`cartLine${id}`)
+    if (row) row.remove()
+    var summaryLine = document.getElementById(`summaryLine${id}`)
+    if (summaryLine) summaryLine.remove()
+}
+
+
+function queueCartChange(id, quantity, immediate){
+    pendingCart[id] = Math.max(quantity, 0)
+    showLine(id, pendingCart[id])
+    clearTimeout(cartTimer)
+    cartTimer = setTimeout(flushCart, immediate ? 0 : CART_DEBOUNCE_MS)
+}
+
+
+function flushCart(){
+    var changes = Object.keys(pendingCart).map(function(id){
+        return {cart_id: parseInt(id, 10), quantity: pendingCart[id]}
     })
-})
+    pendingCart = {}
+    if (!changes.length) return
 
+    // keepalive lets the last batch finish even when the user is leaving the page
+    fetch('/cart', {
+        method: 'PATCH',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(changes),
+        keepalive: true
+    })
+    .then(function(res){
+        if (!res.ok) throw new Error(res.status)
+        return res.json()
+    })
+    .then(function(data){
+        data.items.forEach(function(item){
+            // a newer click on this line is still waiting to be sent
+            if (!(item.cart_id in pendingCart)) showLine(item.cart_id, item.quantity)
+        })
+        document.getElementById('amount_tt').innerText = data.amount
+        document.getElementById('totalamount').innerText = data.total
+    })
+    .catch(function(){
+        window.location.reload()  // resync with what the server has
+    })
+}
 
-$('.minus-cart').click(function(){
-    console.log('Button clicked')
 
+$('.plus-cart').click(function(){
     var id = $(this).attr('pid').toString()
-    var quantity = this.parentNode.children[2]
-
-    $.ajax({
-        type: 'GET',
-        url: '/minuscart',
-        data: {
-            cart_id: id
-        },
-        
-        success: function(data){
-            console.log(data)
-            quantity.innerText = data.quantity
-            document.getElementById(`quantity${id}`).innerText = data.quantity
-            document.getElementById('amount_tt').innerText = data.amount
-            document.getElementById('totalamount').innerText = data.total
-
-        }
-    })
+    queueCartChange(id, cartQuantity(id) + 1)
 })
 
 
-$('.remove-cart').click(function(){
-    
+$('.minus-cart').click(function(){
     var id = $(this).attr('pid').toString()
+    queueCartChange(id, cartQuantity(id) - 1)
+})
 
-    var to_remove = this.parentNode.parentNode.parentNode.parentNode
-
-    $.ajax({
-        type: 'GET',
-        url: '/removecart',
-        data: {
-            cart_id: id
-        },
 
-        success: function(data){
-            document.getElementById('amount_tt').innerText = data.amount
-            document.getElementById('totalamount').innerText = data.total
-            to_remove.remove()
-        }
-    })
+$('.remove-cart').click(function(event){
+    event.preventDefault()
+    var id = $(this).attr('pid').toString()
+    queueCartChange(id, 0, true)
+})
 
 
-})
+window.addEventListener('pagehide', flushCart)
@@ -1,90 +1,106 @@
-from flask import Blueprint, render_template, flash, redirect, request, jsonify
-from .models import Cart, Order, Category, Product, Wishlist
+import logging
+
+from flask import Blueprint, render_template, flash, redirect, request, jsonify, url_for, current_app
+from .models import Cart, Order
 from flask_login import login_required, current_user
-from . import db
-import requests
+from .badges import invalidate_badge_counts
+from .cart import cart_items, cart_totals, add_item, change_quantity, remove_item, set_quantities, \
+    CartItemNotFound, MAX_BATCH_CHANGES
+from .payments import verify_and_checkout, submit_verification, verification_status
+from .search import search_products
+from .cache import get_flash_sale_page, get_categories, get_product
+from .wishlist import wishlist_page, move_all_to_cart, add_to_wishlist as add_wishlist_item, \
+    remove_from_wishlist as remove_wishlist_item
 
 
 views = Blueprint('views', __name__)
-
-KHALTI_SECRET_KEY = "test_secret_key_xxxxxxxxxxxxxxxxxxxxxxxx"  # Replace with your actual test/live secret key
+logger = logging.getLogger(__name__)
 
 @views.route('/')
 def home():
-    items = Product.query.filter_by(flash_sale=True)
-    category = Category.query.all()
-    return render_template('home.html', items=items, categories=category,
-                           cart=Cart.query.filter_by(customer_link=current_user.id).all()
-                           if current_user.is_authenticated else [])
+    page = get_flash_sale_page(request.args.get('cursor'))
+    category = get_categories()
+    return render_template('home.html', items=page.items, page=page, categories=category)
 
 @views.route('/add-to-cart/<int:item_id>')
 @login_required
 def add_to_cart(item_id):
-    item_to_add = Product.query.get(item_id)
-    item_exists = Cart.query.filter_by(product_link=item_id, customer_link=current_user.id).first()
-    if item_exists:
-        try:
-            item_exists.quantity += 1
-            db.session.commit()
-            flash(f'Quantity of {item_exists.product.product_name} updated')
-            return redirect(request.referrer)
-        except Exception as e:
-            print('Quantity not updated:', e)
-            flash('Failed to update quantity')
-            return redirect(request.referrer)
-
-    new_cart_item = Cart(quantity=1, product_link=item_to_add.id, customer_link=current_user.id)
+    item_to_add = get_product(item_id)
+    if item_to_add is None:
+        flash('Product not found')
+        return redirect(request.referrer or '/')
     try:
-        db.session.add(new_cart_item)
-        db.session.commit()
-        flash(f'{new_cart_item.product.product_name} added to cart')
-    except Exception as e:
-        print('Add to cart error:', e)
+        line = add_item(current_user.id, item_id)
+        invalidate_badge_counts()
+        if line['item_quantity'] > 1:
+            flash(f'Quantity of {item_to_add["product_name"]} updated')
+        else:
+            flash(f'{item_to_add["product_name"]} added to cart')
+    except Exception:
+        logger.exception('Add to cart error')
         flash('Item could not be added')
-    return redirect(request.referrer)
+    return redirect(request.referrer or '/')
 
 @views.route('/cart')
 @login_required
 def show_cart():
-    cart = Cart.query.filter_by(customer_link=current_user.id).all()
-    amount = sum(item.product.current_price * item.quantity for item in cart)
-    return render_template('cart.html', cart=cart, amount=amount, total=amount + 200)
+    cart = cart_items(current_user.id)
+    totals = cart_totals(current_user.id)
+    return render_template('cart.html', cart=cart, amount=totals['amount'], total=totals['total'])
+
+@views.route('/cart', methods=['PATCH'])
+@login_required
+def update_cart():
+    """Apply several quantity changes at once: [{"cart_id": 1, "quantity": 3}, ...].
+
+    The cart page batches rapid clicks into one of these; a quantity of 0
+    removes the line. Later entries for the same cart_id win.
+    """
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('items')
+    if not isinstance(payload, list) or not payload or len(payload) > MAX_BATCH_CHANGES:
+        return jsonify({'error': f'Send a list of 1 to {MAX_BATCH_CHANGES} {{cart_id, quantity}} changes'}), 400
+    changes = {}
+    for change in payload:
+        try:
+            cart_id, quantity = int(change['cart_id']), int(change['quantity'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Each change needs an integer cart_id and quantity'}), 400
+        if quantity < 0:
+            return jsonify({'error': 'Quantity cannot be negative'}), 400
+        changes[cart_id] = quantity
+    try:
+        summary = set_quantities(current_user.id, changes)
+    except CartItemNotFound as e:
+        return jsonify({'error': 'Cart item not found', 'cart_ids': e.args[0]}), 404
+    invalidate_badge_counts()
+    return jsonify(summary)
 
 @views.route('/pluscart')
 @login_required
 def plus_cart():
-    cart_id = request.args.get('cart_id')
-    cart_item = Cart.query.get(cart_id)
-    cart_item.quantity += 1
-    db.session.commit()
-    return _cart_amount_json()
+    return _cart_change(change_quantity, 1)
 
 @views.route('/minuscart')
 @login_required
 def minus_cart():
-    cart_id = request.args.get('cart_id')
-    cart_item = Cart.query.get(cart_id)
-    cart_item.quantity -= 1
-    db.session.commit()
-    return _cart_amount_json()
+    return _cart_change(change_quantity, -1)
 
 @views.route('/removecart')
 @login_required
 def remove_cart():
-    cart_id = request.args.get('cart_id')
-    cart_item = Cart.query.get(cart_id)
-    db.session.delete(cart_item)
-    db.session.commit()
-    return _cart_amount_json()
-
-def _cart_amount_json():
-    cart = Cart.query.filter_by(customer_link=current_user.id).all()
-    amount = sum(item.product.current_price * item.quantity for item in cart)
-    return jsonify({
-        'quantity': sum(item.quantity for item in cart),
-        'amount': amount,
-        'total': amount + 200
-    })
+    return _cart_change(remove_item)
+
+def _cart_change(mutation, *args):
+    """Apply one cart mutation and answer with the line and cart summary it returned."""
+    cart_id = request.args.get('cart_id', type=int)
+    try:
+        summary = mutation(current_user.id, cart_id, *args)
+    except CartItemNotFound:
+        return jsonify({'error': 'Cart item not found'}), 404
+    invalidate_badge_counts()
+    return jsonify(summary)
 
 @views.route('/verify-khalti', methods=['POST'])
 @login_required
@@ -94,50 +110,78 @@ def verify_khalti():
         token = data.get('token')
         amount = data.get('amount')
 
-        # Verify with Khalti
-        headers = {
-            "Authorization": f"Key {KHALTI_SECRET_KEY}"
-        }
-        payload = {
-            "token": token,
-            "amount": amount
-        }
-
-        response = requests.post("https://khalti.com/api/v2/payment/verify/", data=payload, headers=headers)
-
-        if response.status_code == 200 and response.json().get('idx'):
-            # Payment successful
-            customer_cart = Cart.query.filter_by(customer_link=current_user.id).all()
-            for item in customer_cart:
-                new_order = Order(
-                    quantity=item.quantity,
-                    price=item.product.current_price,
-                    status='Paid',
-                    payment_id=token,
-                    product_link=item.product_link,
-                    customer_link=item.customer_link
-                )
-                db.session.add(new_order)
-                product = Product.query.get(item.product_link)
-                product.in_stock -= item.quantity
-                db.session.delete(item)
-            db.session.commit()
-            return jsonify({'success': True})
-        else:
-            return jsonify({'success': False})
-    except Exception as e:
-        print("Khalti verification error:", e)
+        if current_app.config.get('KHALTI_ASYNC_VERIFY'):
+            # Hand off to the background pool; the page polls the status URL
+            job_id = submit_verification(current_user.id, token, amount)
+            return jsonify({'success': None, 'pending': True,
+                            'status_url': url_for('views.verify_khalti_status', job_id=job_id)}), 202
+
+        result = verify_and_checkout(current_user.id, token, amount)
+        if result['success']:
+            invalidate_badge_counts()
+        return jsonify(result)
+    except Exception:
+        logger.exception('Khalti verification error')
         return jsonify({'success': False})
-    
+
+
+@views.route('/verify-khalti/<job_id>')
+@login_required
+def verify_khalti_status(job_id):
+    status = verification_status(job_id, current_user.id)
+    if status is None:
+        return jsonify({'success': False, 'message': 'Unknown verification'}), 404
+    return jsonify(status)
+
 
 
 
 @views.route('/wishlist')
 @login_required
 def wishlist():
-    wishlist_items = Wishlist.query.filter_by(customer_id=current_user.id).all()
-    wishlist_count = len(wishlist_items)
-    return render_template('wishlist.html', wishlist_items=wishlist_items, wishlist_count=wishlist_count)
+    page = wishlist_page(current_user.id, request.args.get('cursor'))
+    return render_template('wishlist.html', wishlist_items=page.items, page=page)
+
+
+@views.route('/add-to-wishlist/<int:item_id>', methods=['POST'])
+@login_required
+def add_to_wishlist(item_id):
+    item = get_product(item_id)
+    if item is None:
+        flash("Product not found.", "danger")
+        return redirect(request.referrer or '/')
+
+    if add_wishlist_item(current_user.id, item_id):
+        invalidate_badge_counts()
+        flash(f"'{item['product_name']}' added to your wishlist!", "success")
+    else:
+        flash(f"'{item['product_name']}' is already in your wishlist.", "info")
+    return redirect(url_for('views.wishlist'))
+
+
+@views.route('/remove-from-wishlist/<int:item_id>', methods=['POST'])
+@login_required
+def remove_from_wishlist(item_id):
+    if remove_wishlist_item(current_user.id, item_id):
+        invalidate_badge_counts()
+        flash('Item successfully removed from your wishlist.', 'success')
+    else:
+        flash('That item is not in your wishlist.', 'danger')
+    return redirect(url_for('views.wishlist'))
+
+
+@views.route('/wishlist/move-to-cart', methods=['POST'])
+@login_required
+def move_wishlist_to_cart():
+    try:
+        moved = move_all_to_cart(current_user.id)
+    except Exception:
+        logger.exception('Moving wishlist to cart failed')
+        flash('Could not move your wishlist to the cart.', 'danger')
+        return redirect(url_for('views.wishlist'))
+    invalidate_badge_counts()
+    flash(f'{moved} item(s) moved to your cart.', 'success')
+    return redirect(url_for('views.show_cart'))
 
 
 @views.route('/orders')
@@ -150,7 +194,7 @@ def order():
 def search():
     if request.method == 'POST':
         search_query = request.form.get('search')
-        items = Product.query.filter(Product.product_name.ilike(f'%{search_query}%')).all()
+        items = search_products(search_query)
         return render_template('search.html', items=items,
                                cart=Cart.query.filter_by(customer_link=current_user.id).all()
                                if current_user.is_authenticated else [])
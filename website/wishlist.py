@@ -0,0 +1,97 @@
+from flask import current_app
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
+from .models import Cart, Product, Wishlist
+from .pagination import keyset_page
+from . import db, upsert_insert
+
+
+def wishlist_page(customer_id, cursor=None, per_page=None):
+    """Newest-first page of the customer's wishlist with each product loaded in the same query."""
+    query = (
+        Wishlist.query.join(Wishlist.product)
+        .filter(Wishlist.customer_id == customer_id)
+        .options(contains_eager(Wishlist.product))
+    )
+    return keyset_page(query, Wishlist.id, Wishlist.id, cursor=cursor,
+                       per_page=per_page or current_app.config.get('WISHLIST_PER_PAGE', 24),
+                       descending=True, value_type=int)
+
+
+def add_to_wishlist(customer_id, product_id):
+    """Save a product for later; returns False if it was already on the wishlist.
+
+    A single INSERT ... ON CONFLICT DO NOTHING against the unique
+    (customer_id, product_id) index, so two quick clicks can't both insert.
+    """
+    values = {'customer_id': customer_id, 'product_id': product_id, 'quantity': 1}
+    upsert = upsert_insert(Wishlist.__table__)
+    try:
+        if upsert is not None:
+            result = db.session.execute(
+                upsert.values(**values)
+                .on_conflict_do_nothing(index_elements=['customer_id', 'product_id'])
+            )
+            added = result.rowcount == 1
+        else:
+            db.session.execute(insert(Wishlist.__table__).values(**values))
+            added = True
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        added = False
+    return added
+
+
+def remove_from_wishlist(customer_id, wishlist_id):
+    """Delete one of the customer's wishlist entries; returns False if there was none."""
+    removed = db.session.execute(
+        delete(Wishlist)
+        .where(Wishlist.id == wishlist_id, Wishlist.customer_id == customer_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.session.commit()
+    return removed == 1
+
+
+def move_all_to_cart(customer_id):
+    """Move every wishlist entry into the cart in one transaction; returns how many moved.
+
+    Products already in the cart have their quantity increased. Entries whose
+    product has since been deleted are dropped rather than moved.
+    """
+    cart = Cart.__table__
+    entries = (
+        select(literal(customer_id), Wishlist.product_id, Wishlist.quantity)
+        .join(Product, Product.id == Wishlist.product_id)
+        .where(Wishlist.customer_id == customer_id)
+    )
+    upsert = upsert_insert(cart)
+    try:
+        moved = db.session.execute(select(func.count()).select_from(entries.subquery())).scalar()
+        if moved:
+            if upsert is not None:
+                upsert = upsert.from_select(['customer_link', 'product_link', 'quantity'], entries)
+                db.session.execute(upsert.on_conflict_do_update(
+                    index_elements=['customer_link', 'product_link'],
+                    set_={'quantity': cart.c.quantity + upsert.excluded.quantity},
+                ))
+            else:
+                for _, product_id, quantity in db.session.execute(entries).all():
+                    updated = db.session.execute(
+                        update(cart)
+                        .where(cart.c.customer_link == customer_id, cart.c.product_link == product_id)
+                        .values(quantity=cart.c.quantity + quantity)
+                    ).rowcount
+                    if not updated:
+                        db.session.execute(insert(cart).values(customer_link=customer_id, product_link=product_id,
+                                                               quantity=quantity))
+        db.session.execute(
+            delete(Wishlist).where(Wishlist.customer_id == customer_id).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return moved